@@ -0,0 +1,50 @@
+"""Write a file or folder under a temporary name and move it in place once complete,
+so concurrent runs (batch workers, the service) never see it half-written.
+
+    with atomic_path(cache_path) as tmp_path:
+        df.to_parquet(tmp_path)
+
+    with atomic_folder(cube_path) as tmp_path:
+        table.to_parquet(os.path.join(tmp_path, 'table.parquet'))
+
+Only the standard library is imported, pages.py is used without pandas loaded.
+"""
+import os
+import shutil
+from contextlib import contextmanager
+
+
+def temporary_path(path):
+    """name a process writes path under, unique per process
+    """
+    return '%s.%d.tmp' % (path, os.getpid())
+
+@contextmanager
+def atomic_path(path):
+    """a temporary file name to write instead of path, moved to path when the block
+    ends; removed when the block raises
+    """
+    tmp_path = temporary_path(path)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+@contextmanager
+def atomic_folder(path):
+    """a temporary folder to fill instead of path, replacing the folder path when the
+    block ends; removed when the block raises
+    """
+    tmp_path = temporary_path(path)
+    os.makedirs(tmp_path, exist_ok=True)
+    try:
+        yield tmp_path
+        # a folder cannot be replaced in one step, the old one is moved aside first
+        if os.path.isdir(path):
+            os.rename(path, tmp_path + '.old')
+        os.rename(tmp_path, path)
+        shutil.rmtree(tmp_path + '.old', ignore_errors=True)
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
@@ -0,0 +1,157 @@
+import argparse
+import csv
+import os
+import re
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from pages import consolidate, find_pages
+
+
+def jobs_from_directory(directory):
+    """pair up the China Exports and US Imports csv files of each company in directory.
+
+    The company is taken from the Panjiva file name, compared case-insensitively.
+    A download split over several page files is returned as the list of its pages,
+    merged when the job runs (see pages.py). Companies missing one of the two
+    datasets are returned with None in its place.
+    """
+    return [(company, files.get('china_exports'), files.get('us_imports'))
+            for company, files in sorted(find_pages(directory).items()) if company]
+
+def jobs_from_manifest(manifest):
+    """read (company, china_exports, us_imports) rows from a csv manifest with those column names.
+    Relative file paths are resolved against the manifest's folder; the pages of a
+    download are listed in one cell, separated by ';'.
+    """
+    base = os.path.dirname(os.path.abspath(manifest))
+    jobs = []
+    with open(manifest, newline='') as f:
+        for row in csv.DictReader(f):
+            paths = [[os.path.join(base, page.strip()) for page in row[column].split(';')] if row[column] else None
+                     for column in ('china_exports', 'us_imports')]
+            jobs.append((row['company'], paths[0], paths[1]))
+    return jobs
+
+def safe_name(company):
+    """file-system safe version of a company name
+    """
+    return re.sub(r'[^\w.-]+', '_', company).strip('_')
+
+def output_name(company):
+    """file name of a company's report
+    """
+    return safe_name(company) + '.pptx'
+
+def run_job(job, output_dir, template, chunksize=None):
+    """build one company's report, returning its timing and error instead of raising
+    """
+    # imported here so the parent process does not need the report dependencies loaded
+    from main import build_report
+    import tracing
+
+    company, china_exports_file, us_imports_file = job
+    output = os.path.join(output_dir, output_name(company))
+    start = time.perf_counter()
+    error = None
+    try:
+        if not china_exports_file or not us_imports_file:
+            raise FileNotFoundError('missing China Exports or US Imports csv for ' + company)
+        china_exports_file, us_imports_file = consolidate(china_exports_file), consolidate(us_imports_file)
+        # the pool already keeps every core busy, so each report computes its slides in turn
+        build_report(china_exports_file, us_imports_file, output, template, chunksize, workers=1)
+    except Exception:
+        error = traceback.format_exc()
+        output = None
+    if tracing.is_enabled():
+        # workers are reused across jobs, each job gets its own trace next to its report
+        tracing.write(os.path.join(output_dir, safe_name(company) + '.trace.json'))
+        tracing.reset()
+    return {'company': company, 'output': output,
+            'seconds': round(time.perf_counter() - start, 3), 'error': error}
+
+def failed_result(job):
+    """result of a job that raised in the parent, with the traceback being handled
+    """
+    return {'company': job[0], 'output': None, 'seconds': None, 'error': traceback.format_exc()}
+
+def report_result(result, results):
+    """add a job's result to results and print its status
+    """
+    results.append(result)
+    status = 'failed' if result['error'] else 'ok'
+    print('%-8s %-40s %ss' % (status, result['company'], result['seconds']))
+
+def run_isolated(job, output_dir, template, chunksize=None):
+    """run one job in a process of its own, so that a crash fails this job only
+    """
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        try:
+            return pool.submit(run_job, job, output_dir, template, chunksize).result()
+        except Exception:
+            return failed_result(job)
+
+def run_batch(jobs, output_dir, template='template.pptx', workers=None, chunksize=None):
+    """build the reports of all jobs on a process pool, one output file per company.
+
+    workers defaults to the number of cores. A failing job (bad csv) is recorded in
+    its result and does not stop the other jobs. A worker process that dies (out of
+    memory, segfault) breaks the pool for every job it had not finished, so those
+    jobs are run again, each in a process of its own, and only the one that crashes
+    fails. With a chunksize the csv files are streamed with bounded memory, see
+    main.build_report.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    template = os.path.abspath(template)
+    workers = workers or os.cpu_count()
+    results = []
+    broken = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_job, job, output_dir, template, chunksize): job for job in jobs}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                broken.append(futures[future])
+                continue
+            except Exception:
+                result = failed_result(futures[future])
+            report_result(result, results)
+
+    if broken:
+        print('a worker died, running the %d unfinished jobs one per process' % len(broken))
+        with ThreadPoolExecutor(max_workers=workers) as threads:
+            isolated = [threads.submit(run_isolated, job, output_dir, template, chunksize) for job in broken]
+            for future in as_completed(isolated):
+                report_result(future.result(), results)
+    return results
+
+def write_summary(results, path):
+    """write per-job timing and errors to a csv file
+    """
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['company', 'output', 'seconds', 'error'])
+        writer.writeheader()
+        writer.writerows(sorted(results, key=lambda result: result['company']))
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Build the reports of many companies in parallel.')
+    source = arg_parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--directory', help='folder with Panjiva csv downloads of several companies')
+    source.add_argument('--manifest', help='csv with company, china_exports and us_imports columns')
+    arg_parser.add_argument('--output-dir', default='reports')
+    arg_parser.add_argument('--template', default='template.pptx')
+    arg_parser.add_argument('--workers', type=int, default=None, help='defaults to the number of cores')
+    arg_parser.add_argument('--chunksize', type=int, default=None,
+                            help='stream the csv files this many rows at a time, for histories larger than memory')
+    args = arg_parser.parse_args()
+
+    jobs = jobs_from_directory(args.directory) if args.directory else jobs_from_manifest(args.manifest)
+    start = time.perf_counter()
+    results = run_batch(jobs, args.output_dir, args.template, args.workers, args.chunksize)
+    write_summary(results, os.path.join(args.output_dir, 'batch_summary.csv'))
+    failed = [result for result in results if result['error']]
+    print('%d reports, %d failed, %.1fs' % (len(results), len(failed), time.perf_counter() - start))
@@ -0,0 +1,175 @@
+"""Time and memory-profile every stage of a report on synthetic data of growing size.
+
+    python3 -m benchmarks.run --sizes 1000 100000 1000000
+    python3 -m benchmarks.run --sizes 1000 100000 --compare benchmarks/results/baseline.json
+
+Run from the repository root. Each stage records its wall time and the peak memory
+traced by tracemalloc (numpy and pandas allocations included), and the results are
+written as json so two versions can be compared. tracemalloc slows allocations down
+a lot, so the stages are run twice: timed in a first pass and traced in a second.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmarks.synthetic import END_DATE, generate
+
+DATA_DIR = os.path.join('benchmarks', 'data')
+RESULTS_DIR = os.path.join('benchmarks', 'results')
+
+# (function, frames it is called with), in the order the report uses them
+PANJIVA_STAGES = [
+    ('exports_summary_sentences', ['china_exports']),
+    ('shipment_destinations', ['china_exports']),
+    ('yearly_exports', ['china_exports']),
+    ('hs_exports', ['china_exports']),
+    ('hs_exports_summary_sentence', ['china_exports']),
+    ('yearly_imports_summary_sentence', ['us_imports']),
+    ('yearly_imports', ['us_imports']),
+    ('monthly_imports', ['us_imports_12']),
+    ('hs_imports_summary_sentence', ['us_imports']),
+    ('hs_imports', ['us_imports']),
+    ('hs_imports_merge_12', ['us_imports', 'us_imports_12']),
+    ('consignees_imports_summary_sentence', ['us_imports']),
+    ('consignees_imports', ['us_imports']),
+    ('consignees_imports_12_summary_sentence', ['us_imports_12']),
+    ('consignees_imports_12', ['us_imports_12']),
+    ('recent_shipments', ['us_imports']),
+]
+
+PARSER_STAGES = [
+    'parse_shipment_destinations', 'parse_yearly_exports', 'parse_hs_exports', 'parse_yearly_imports',
+    'parse_hs_imports', 'parse_consignees_imports', 'parse_consignees_imports_12', 'parse_recent_shipments',
+]
+
+
+def seconds(func, *args):
+    """(result, seconds) of one call
+    """
+    gc.collect()
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def peak_mb(func, *args):
+    """(result, peak MB traced) of one call
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, peak / 1e6
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_stages(china_exports_file, us_imports_file, measure, report=True):
+    """[(group, stage, measurement)] of every stage, in order, each measured by measure
+    (seconds or peak_mb)
+    """
+    import pandas as pd
+
+    import ingest
+    import panjiva
+
+    measurements = []
+
+    def record(group, stage, func, *args):
+        result, measurement = measure(func, *args)
+        measurements.append((group, stage, measurement))
+        return result
+
+    frames = {}
+    frames['china_exports'] = record('ingest', 'load_china_exports (csv)',
+                                     ingest.load_china_exports, china_exports_file, None)
+    frames['us_imports'] = record('ingest', 'load_us_imports (csv)',
+                                  ingest.load_us_imports, us_imports_file, None)
+    us_imports = frames['us_imports']
+    # the recent 12 months of the data, which ends on END_DATE rather than today
+    starting_month = panjiva.month_code(pd.Timestamp(END_DATE)) - 12
+    frames['us_imports_12'] = us_imports[us_imports['month'].ge(starting_month).fillna(False)]
+
+    for name, frame_names in PANJIVA_STAGES:
+        record('panjiva', name, getattr(panjiva, name), *[frames[frame] for frame in frame_names])
+
+    if report:
+        from parser import parser
+        report = record('parser', '__init__', parser, 'template.pptx', frames['china_exports'],
+                        frames['us_imports'], frames['us_imports_12'])
+        for name in PARSER_STAGES:
+            record('parser', name, getattr(report, name))
+        record('parser', 'save', report.save)
+    return measurements
+
+def run_size(rows, seed=0, report=True):
+    """results of every stage for synthetic files of `rows` rows
+    """
+    china_exports_file, us_imports_file = generate(DATA_DIR, rows, seed)
+    # each pass starts from the csv files, with a report of its own
+    timings = run_stages(china_exports_file, us_imports_file, seconds, report)
+    peaks = run_stages(china_exports_file, us_imports_file, peak_mb, report)
+    return [{'rows': rows, 'group': group, 'stage': stage, 'seconds': round(time_taken, 6), 'peak_mb': round(peak, 3)}
+            for (group, stage, time_taken), (_, _, peak) in zip(timings, peaks)]
+
+def compare(results, baseline, threshold):
+    """stages slower than threshold times the same stage of the baseline
+    """
+    previous = {(r['rows'], r['group'], r['stage']): r for r in baseline['results']}
+    regressions = []
+    for r in results:
+        old = previous.get((r['rows'], r['group'], r['stage']))
+        # ignore stages too fast to time reliably
+        if old and old['seconds'] > 0.005 and r['seconds'] > old['seconds'] * threshold:
+            regressions.append((r, old))
+    return regressions
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Benchmark the report on synthetic Panjiva data.')
+    arg_parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                            help='rows per file, e.g. 1000 100000 10000000')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--no-report', action='store_true', help='skip the python-pptx stages')
+    arg_parser.add_argument('--output', default=None, help='defaults to benchmarks/results/<timestamp>.json')
+    arg_parser.add_argument('--compare', default=None, help='results json of a previous run')
+    arg_parser.add_argument('--threshold', type=float, default=1.25,
+                            help='slowdown ratio reported as a regression')
+    args = arg_parser.parse_args()
+
+    import pandas as pd
+    results = []
+    for rows in args.sizes:
+        for r in run_size(rows, args.seed, not args.no_report):
+            print('%10d  %-8s %-42s %9.3fs %10.1f MB' % (r['rows'], r['group'], r['stage'],
+                                                         r['seconds'], r['peak_mb']))
+            results.append(r)
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'revision': git_revision(), 'created': datetime.now().isoformat(),
+                   'python': platform.python_version(), 'pandas': pd.__version__,
+                   'seed': args.seed, 'results': results}, f, indent=1)
+    print('results written to ' + output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for r, old in regressions:
+            print('REGRESSION %d rows %s %s: %.3fs -> %.3fs' % (r['rows'], r['group'], r['stage'],
+                                                              old['seconds'], r['seconds']))
+        if regressions:
+            raise SystemExit(1)
@@ -0,0 +1,189 @@
+"""Synthetic Panjiva downloads with the columns and value formats of the real exports.
+
+Cardinalities follow the bundled Zhejiang Everich files scaled up: a few hundred
+destinations and 6-digit HS codes, a consignee population growing with the number
+of rows, skewed (Zipf-like) popularity, multi-valued US HS codes and spelling
+variants of the same consignee.
+
+The files are the same on every run for a given size and seed: the dates end on
+END_DATE, and each file is drawn from a random generator of its own.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from atomic import atomic_path
+
+CHINA_EXPORTS_HEADER = [
+    'Shipment Month', 'Matching Fields', 'Shipper', 'Shipper Full Address', 'Shipper Email 1',
+    'Shipper Phone 1', 'Shipper Website 1', 'Shipper Profile', 'Shipper Trade Roles',
+    'Shipper Name (Chinese Format)', 'Shipper Address (Chinese Format)', 'Shipper Address (Original Format)',
+    'Shipper Global HQ', 'Shipper Global HQ Address', 'Shipper Global HQ D-U-N-S®', 'Shipper Domestic HQ',
+    'Shipper Domestic HQ Address', 'Shipper Domestic HQ D-U-N-S®', 'Shipment Destination', 'Province',
+    'Country of Sale', 'Transport Method', 'Is Containerized', 'Value of Goods (USD)', 'HS Code',
+    'HS Code Description', 'HS Code Keywords', 'Trade Direction', 'Admin Region', 'Trade Type',
+]
+
+US_IMPORTS_HEADER = [
+    'Arrival Date', 'Consignee', 'Consignee Address', 'Consignee City', 'Consignee State/Region',
+    'Consignee Postal Code', 'Consignee Country', 'Consignee Full Address', 'Consignee Email 1',
+    'Consignee Email 2', 'Consignee Email 3', 'Consignee Phone 1', 'Consignee Phone 2', 'Consignee Phone 3',
+    'Consignee Fax', 'Consignee Website 1', 'Consignee Website 2', 'Consignee Profile', 'Consignee D-U-N-S®',
+    'Consignee Industry', 'Consignee Revenue', 'Consignee Employees', 'Consignee Market Capitalization',
+    'Consignee Trade Roles', 'Consignee SIC Codes', 'Shipper', 'Shipper Address', 'Shipper City',
+    'Shipper State/Region', 'Shipper Postal Code', 'Shipper Country', 'Shipper Full Address',
+    'Shipper Email 1', 'Shipper Email 2', 'Shipper Email 3', 'Shipper Phone 1', 'Shipper Phone 2',
+    'Shipper Phone 3', 'Shipper Fax', 'Shipper Website 1', 'Shipper Website 2', 'Shipper Profile',
+    'Shipper D-U-N-S®', 'Shipper Industry', 'Shipper Revenue', 'Shipper Employees',
+    'Shipper Market Capitalization', 'Shipper Trade Roles', 'Shipper SIC Codes', 'Shipment Destination',
+    'Shipment Destination Region', 'Quantity', 'Weight (kg)', 'Value of Goods (USD)', 'Number of Containers',
+    'HS Code', 'Goods Shipped',
+]
+
+# real names first so the heat map has something to color
+COUNTRIES = [
+    'United States', 'Germany', 'United Kingdom', 'Japan', 'France', 'Italy', 'Canada', 'Australia',
+    'Spain', 'Netherlands', 'Russia', 'Brazil', 'Mexico', 'India', 'South Korea', 'Poland', 'Chile',
+    'Saudi Arabia', 'United Arab Emirates', 'Turkey', 'Vietnam', 'Thailand', 'Malaysia', 'Indonesia',
+    'Philippines', 'South Africa', 'Argentina', 'Peru', 'Colombia', 'Sweden', 'Norway', 'Denmark',
+    'Finland', 'Belgium', 'Austria', 'Switzerland', 'Israel', 'Egypt', 'Nigeria', 'Kenya',
+]
+US_PORTS = [
+    'Port of Los Angeles, Los Angeles, California', 'Port of Long Beach, Long Beach, California',
+    'Port of Oakland, Oakland, California', 'Port of Seattle, Seattle, Washington',
+    'Port of Tacoma, Tacoma, Washington', 'Port of New York, New York, New York',
+    'Port of Savannah, Savannah, Georgia', 'Port of Houston, Houston, Texas',
+    'Port of Charleston, Charleston, South Carolina', 'Port of Norfolk, Norfolk, Virginia',
+]
+GOODS = [
+    'VACUUM CUP', 'DW FLASK', 'STAINLESS STEEL DRINK STRAWS', 'TUMBLER', 'VACUUM FLASK',
+    'WATER BOTTLE', 'KITCHENWARE', 'BBQ SET', 'LUNCH BOX', 'COFFEE MUG', 'BAR TOOL SET', 'FOOD JAR',
+]
+SUFFIXES = ['Llc', 'Inc', 'Inc.', 'LLC', 'Co', 'Corp', 'Ltd']
+# last shipment date of the synthetic downloads
+END_DATE = '2026-06-30'
+# part of the file names, bump when the generated data changes so cached files are rewritten
+DATA_VERSION = 2
+
+
+def zipf_choice(rng, n_values, size, a=1.3):
+    """indices into n_values with a skewed popularity, the first values the most common
+    """
+    weights = 1.0 / np.arange(1, n_values + 1) ** a
+    return rng.choice(n_values, size=size, p=weights / weights.sum())
+
+def random_dates(rng, size, years=6, end=END_DATE):
+    """uniformly spread dates of the `years` years up to end, newest first like the Panjiva downloads
+    """
+    end = pd.Timestamp(end).normalize()
+    days = np.sort(rng.integers(0, years * 365, size=size))
+    return end - pd.to_timedelta(days, unit='D')
+
+def hs_codes(n_codes, rng):
+    """distinct 6-digit HS codes from chapters 39 - 96, the common ones first
+    """
+    codes = set()
+    while len(codes) < n_codes:
+        codes.add('%02d%04d' % (rng.integers(39, 97), rng.integers(0, 10000)))
+    return sorted(codes)
+
+def china_exports_chunk(rng, dates, codes):
+    n = len(dates)
+    destinations = np.array(COUNTRIES + ['Country %d' % i for i in range(200)])
+    destination = destinations[zipf_choice(rng, len(destinations), n)]
+    code = np.array(codes)[zipf_choice(rng, len(codes), n, a=1.1)]
+    months = dates.to_period('M').to_timestamp()
+    df = pd.DataFrame({column: '' for column in CHINA_EXPORTS_HEADER}, index=range(n))
+    df['Shipment Month'] = months.strftime('%Y-%m-%d')
+    df['Matching Fields'] = 'Company name'
+    df['Shipper'] = 'Synthetic Houseware Co., Ltd.'
+    df['Shipment Destination'] = destination
+    df['Country of Sale'] = destination
+    df['Province'] = 'Zhejiang Province'
+    df['Transport Method'] = 'River-Sea Transportation'
+    df['Is Containerized'] = 'Yes'
+    df['Value of Goods (USD)'] = np.round(rng.lognormal(8, 1.5, n), 2)
+    df['HS Code'] = code
+    df['HS Code Description'] = pd.Series(code).map(lambda c: 'Articles of heading ' + c[:4] + ', subheading ' + c)
+    df['HS Code Keywords'] = np.array(GOODS)[rng.integers(0, len(GOODS), n)]
+    df['Trade Direction'] = 'Export'
+    df['Trade Type'] = 'Ordinary Trade'
+    return df
+
+def consignee_names(n_consignees, rng):
+    """consignee names and D-U-N-S numbers, with a third of them spelled in several ways
+    """
+    base = ['Buyer %d %s' % (i, SUFFIXES[i % len(SUFFIXES)]) for i in range(n_consignees)]
+    duns = np.where(rng.random(n_consignees) < 0.6,
+                    pd.Series(rng.integers(10 ** 8, 10 ** 9, n_consignees)).astype(str), '')
+    names, numbers = list(base), list(duns)
+    for i in range(0, n_consignees, 3):
+        names.append(base[i].upper())
+        names.append(base[i].replace(' %s' % SUFFIXES[i % len(SUFFIXES)], ', %s' % SUFFIXES[(i + 1) % len(SUFFIXES)]))
+        names.append(base[i] + ' 100 Main Street')
+        numbers += [duns[i]] * 3
+    return np.array(names), np.array(numbers)
+
+def us_imports_chunk(rng, dates, codes, consignees, duns):
+    n = len(dates)
+    pick = zipf_choice(rng, len(consignees), n, a=1.05)
+    # 0 to 3 codes per shipment, e.g. '7323.93; 9617.00'
+    n_codes = rng.integers(0, 4, n)
+    code_pool = np.array([c[:4] + '.' + c[4:] for c in codes])
+    parts = code_pool[zipf_choice(rng, len(code_pool), n * 3, a=1.1)].reshape(n, 3)
+    hs = np.where(n_codes >= 1, parts[:, 0], '')
+    for k in (1, 2):
+        hs = np.where(n_codes > k, np.char.add(np.char.add(hs, '; '), parts[:, k]), hs)
+    goods = np.array(GOODS)[rng.integers(0, len(GOODS), n)]
+    second = np.array(GOODS)[rng.integers(0, len(GOODS), n)]
+    goods = np.where(rng.random(n) < 0.3, np.char.add(np.char.add(goods, '\n'), second), goods)
+    df = pd.DataFrame({column: '' for column in US_IMPORTS_HEADER}, index=range(n))
+    df['Arrival Date'] = dates.strftime('%Y-%m-%d')
+    df['Consignee'] = consignees[pick]
+    df['Consignee Country'] = 'United States'
+    df['Consignee D-U-N-S®'] = duns[pick]
+    df['Shipper'] = 'Synthetic Commerce Group Ltd.'
+    df['Shipper Country'] = 'China'
+    df['Shipment Destination'] = np.array(US_PORTS)[zipf_choice(rng, len(US_PORTS), n)]
+    df['Shipment Destination Region'] = 'Pacific Region'
+    df['Quantity'] = pd.Series(rng.integers(1, 3000, n)).astype(str) + np.where(rng.random(n) < 0.5, ' CTN', ' PKG')
+    df['Weight (kg)'] = np.round(rng.lognormal(8, 1, n), 1)
+    df['Number of Containers'] = rng.integers(1, 6, n)
+    df['HS Code'] = hs
+    df['Goods Shipped'] = goods
+    return df
+
+def write_csv(path, chunks):
+    """append chunks to one csv, writing the header once
+    """
+    with atomic_path(path) as tmp_path:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(tmp_path, index=False, header=(i == 0), mode='w' if i == 0 else 'a')
+
+def generate(directory, rows, seed=0, chunk_rows=1000000):
+    """write a China Exports and a US Imports csv of `rows` rows each into directory,
+    named like Panjiva downloads; existing files of the same size and seed are reused
+    """
+    os.makedirs(directory, exist_ok=True)
+    name = 'synthetic_v%d_%d_%d-results_1_to_%d_of_%d.csv' % (DATA_VERSION, rows, seed, rows, rows)
+    china_exports_file = os.path.join(directory, 'Panjiva-China_Exports-' + name)
+    us_imports_file = os.path.join(directory, 'Panjiva-US_Imports-' + name)
+    # the HS codes are shared by both files, each file has its own generator so that
+    # one is the same whether or not the other is already written
+    codes = hs_codes(min(2000, max(50, rows // 50)), np.random.default_rng([seed, 0]))
+    starts = range(0, rows, chunk_rows)
+
+    if not os.path.exists(china_exports_file):
+        rng = np.random.default_rng([seed, 1])
+        dates = random_dates(rng, rows)
+        write_csv(china_exports_file,
+                  (china_exports_chunk(rng, dates[start:start + chunk_rows], codes) for start in starts))
+    if not os.path.exists(us_imports_file):
+        rng = np.random.default_rng([seed, 2])
+        dates = random_dates(rng, rows)
+        consignees, duns = consignee_names(min(200000, max(50, rows // 10)), rng)
+        write_csv(us_imports_file,
+                  (us_imports_chunk(rng, dates[start:start + chunk_rows], codes, consignees, duns)
+                   for start in starts))
+    return china_exports_file, us_imports_file
@@ -0,0 +1,94 @@
+import math
+
+from lxml import etree
+from pptx.chart.data import CategoryChartData
+from pptx.oxml.ns import qn
+
+NUMBER_FORMAT = '#,##0'
+SHEET = 'Sheet1'
+# children of a <c:ser> rewritten by fill_chart
+SERIES_PARTS = ('c:tx', 'c:cat', 'c:val')
+
+
+def column_letter(number):
+    """spreadsheet letters of a 1-based column number: 1 -> A, 28 -> AB
+    """
+    letters = ''
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+def cell_range(column, first_row, last_row=None):
+    """formula reference to cells of a column of the embedded sheet, e.g. Sheet1!$B$2:$B$6
+    """
+    letter = column_letter(column)
+    if last_row is None or last_row == first_row:
+        return '%s!$%s$%d' % (SHEET, letter, first_row)
+    return '%s!$%s$%d:$%s$%d' % (SHEET, letter, first_row, letter, last_row)
+
+def make_ref(tag, ref, values, number_format=None):
+    """a <c:strRef> or <c:numRef> (tag) holding the reference and cached points of values;
+    missing numbers are left out, as PowerPoint writes them
+    """
+    cache_tag = 'c:strCache' if tag == 'c:strRef' else 'c:numCache'
+    element = etree.Element(qn(tag))
+    etree.SubElement(element, qn('c:f')).text = ref
+    cache = etree.SubElement(element, qn(cache_tag))
+    if number_format is not None:
+        etree.SubElement(cache, qn('c:formatCode')).text = number_format
+    etree.SubElement(cache, qn('c:ptCount'), val=str(len(values)))
+    for i, value in enumerate(values):
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            continue
+        pt = etree.SubElement(cache, qn('c:pt'), idx=str(i))
+        etree.SubElement(pt, qn('c:v')).text = str(value)
+    return element
+
+def replace_child(ser, tag, ref):
+    """put ref in the <tag> child of a <c:ser>, in place of whatever it held
+    """
+    child = ser.find(qn(tag))
+    for old in list(child):
+        child.remove(old)
+    child.append(ref)
+
+def chart_data(categories, series, number_format=NUMBER_FORMAT):
+    """python-pptx CategoryChartData of categories and series [(name, values), ...]
+    """
+    data = CategoryChartData(number_format=number_format)
+    data.categories = categories
+    for name, values in series:
+        data.add_series(name, values)
+    return data
+
+def fill_chart(chart, categories, series, number_format=NUMBER_FORMAT):
+    """write categories and series [(name, values), ...] into the cached data of a
+    python-pptx category chart, with any number of points, in a single pass over the xml.
+
+    Formatting of the template series (fills, data labels) is kept. The embedded
+    workbook is left as it is, see update_workbook. A chart with another number of
+    series than given goes through chart.replace_data, workbook included, and False
+    is returned.
+    """
+    categories = [str(category) for category in categories]
+    series = [(name, list(values)) for name, values in series]
+    sers = chart._chartSpace.plotArea.sers
+    if len(sers) != len(series) or any(ser.find(qn(tag)) is None for ser in sers for tag in SERIES_PARTS):
+        chart.replace_data(chart_data(categories, series, number_format))
+        return False
+
+    last_row = len(categories) + 1
+    # categories in column A and series from column B on, as python-pptx writes the workbook
+    for column, (ser, (name, values)) in enumerate(zip(sers, series), start=2):
+        replace_child(ser, 'c:tx', make_ref('c:strRef', cell_range(column, 1), [name]))
+        replace_child(ser, 'c:cat', make_ref('c:strRef', cell_range(1, 2, last_row), categories))
+        replace_child(ser, 'c:val', make_ref('c:numRef', cell_range(column, 2, last_row), values, number_format))
+    return True
+
+def update_workbook(chart, categories, series, number_format=NUMBER_FORMAT):
+    """rewrite the workbook embedded in a chart, opened by PowerPoint's Edit Data
+    """
+    xlsx_blob = chart_data(categories, series, number_format).xlsx_blob
+    chart.part.chart_workbook.update_from_xlsx_blob(xlsx_blob)
+    return chart
@@ -0,0 +1,263 @@
+"""Command line entry point of the report.
+
+    python3 cli.py build --directory . --output report.pptx
+    python3 cli.py build --china-exports exports.csv --us-imports imports.csv --no-map
+    python3 cli.py export --directory . --format json --output report.json
+    python3 cli.py validate --directory .
+    python3 cli.py merge --output imports.csv imports-page-1.csv imports-page-2.csv
+    python3 cli.py query --by Consignee --where 'HS Code^=7323' --where year=2018 --top 10
+    python3 cli.py search vacuum flask --top 10
+    python3 cli.py slides
+
+Only the standard library is imported up front. Each command imports what it uses:
+`slides` nothing more, `validate` and `export` pandas, `build` python-pptx as well,
+and geopandas and matplotlib are loaded only when the map slide is drawn.
+"""
+import argparse
+import os
+import sys
+
+# default output of each export format
+EXPORT_OUTPUTS = {'json': 'report.json', 'csv': 'tables', 'xlsx': 'report.xlsx'}
+
+def add_input_arguments(arg_parser):
+    arg_parser.add_argument('--directory', default='.',
+                            help='folder holding the China Exports and US Imports csv files')
+    arg_parser.add_argument('--china-exports', action='append', metavar='CSV',
+                            help='China Exports csv, instead of --directory; repeat it for the pages of a download')
+    arg_parser.add_argument('--us-imports', action='append', metavar='CSV',
+                            help='US Imports csv, instead of --directory; repeat it for the pages of a download')
+
+def input_files(args):
+    """the China Exports and US Imports files named on the command line or found in --directory,
+    the pages of a download merged into one file, see pages.py
+    """
+    from pages import consolidate, find_input_files
+
+    # the directory is only searched for the datasets not named on the command line
+    missing = [dataset for dataset, paths in (('china_exports', args.china_exports), ('us_imports', args.us_imports))
+               if not paths]
+    try:
+        china_exports_file, us_imports_file = find_input_files(args.directory, datasets=missing)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    if args.china_exports:
+        china_exports_file = consolidate(args.china_exports)
+    if args.us_imports:
+        us_imports_file = consolidate(args.us_imports)
+    for name, path in (('China Exports', china_exports_file), ('US Imports', us_imports_file)):
+        if not path or not os.path.isfile(path):
+            raise SystemExit('no %s csv found, pass it with --%s' % (name, name.lower().replace(' ', '-')))
+    return china_exports_file, us_imports_file
+
+def skipped_slides(args):
+    from slides import MAP_SLIDE
+
+    skip = list(args.skip or [])
+    if args.no_map:
+        skip.append(MAP_SLIDE)
+    return skip
+
+def build(args):
+    import tracing
+    from main import build_report
+
+    china_exports_file, us_imports_file = input_files(args)
+    output = build_report(china_exports_file, us_imports_file, args.output, args.template,
+                          args.chunksize, args.workers, skipped_slides(args), args.cube, not args.no_chart_workbooks)
+    print('report written to ' + output)
+    if tracing.is_enabled():
+        print('trace written to ' + tracing.write())
+
+def export(args):
+    """write the tables and summary sentences of every slide without building the deck
+    """
+    from context import load_frames
+    from renderers import render
+
+    china_exports_file, us_imports_file = input_files(args)
+    output = args.output or EXPORT_OUTPUTS[args.format]
+    render(load_frames(china_exports_file, us_imports_file, args.chunksize, args.cube), output, args.format,
+           workers=args.workers, skip=args.skip or ())
+    print('data written to ' + output)
+
+def validate(args):
+    """check both csv files have the columns the report reads and parseable dates
+    """
+    from ingest import CHINA_EXPORTS_COLUMNS, OPTIONAL_COLUMNS, US_IMPORTS_COLUMNS, iter_csv
+    import pandas as pd
+
+    china_exports_file, us_imports_file = input_files(args)
+    problems = 0
+    for path, columns, date_column in ((china_exports_file, CHINA_EXPORTS_COLUMNS, 'Shipment Month'),
+                                       (us_imports_file, US_IMPORTS_COLUMNS, 'Arrival Date')):
+        header = pd.read_csv(path, nrows=0).columns
+        missing = [column for column in columns if column not in header and column not in OPTIONAL_COLUMNS]
+        if missing:
+            print('%s: missing columns %s' % (path, ', '.join(missing)))
+            problems += 1
+            continue
+        n_rows = bad_dates = 0
+        first = last = None
+        for chunk in iter_csv(path, columns, date_column, args.chunksize or 100000):
+            dates = chunk[date_column]
+            n_rows += len(chunk)
+            bad_dates += int(dates.isna().sum())
+            if dates.notna().any():
+                first = dates.min() if first is None else min(first, dates.min())
+                last = dates.max() if last is None else max(last, dates.max())
+        if not n_rows:
+            print('%s: no rows' % path)
+            problems += 1
+            continue
+        if bad_dates:
+            print('%s: %d of %d rows with a missing or unreadable %s' % (path, bad_dates, n_rows, date_column))
+            problems += 1
+        print('%s: %d rows from %s to %s' % (path, n_rows, first and first.date(), last and last.date()))
+    if problems:
+        raise SystemExit(1)
+
+def parse_condition(text):
+    """(column, condition) of a --where argument: 'year=2018', 'month=2018-05|2018-06',
+    'Consignee=A|B', 'HS Code^=7323' or 'month^=2018'
+    """
+    from cube import hs_code_prefix, month_labels, parse_month
+
+    if '^=' in text:
+        column, prefix = text.split('^=', 1)
+        if column == 'HS Code':
+            return column, hs_code_prefix(prefix)
+        if column == 'month':
+            return column, lambda codes: month_labels(codes).str.startswith(prefix, na=False)
+        return column, lambda values: values.astype(str).str.startswith(prefix)
+    if '=' not in text:
+        raise SystemExit('--where takes COLUMN=VALUE or COLUMN^=PREFIX, not ' + text)
+    column, value = text.split('=', 1)
+    try:
+        values = [int(v) if column == 'year' else parse_month(v) if column == 'month' else v
+                  for v in value.split('|')]
+    except ValueError as e:
+        raise SystemExit('--where %s: %s' % (text, e))
+    return column, values if len(values) > 1 else values[0]
+
+def query(args):
+    """answer a question from the aggregate cube of one download
+    """
+    import pandas as pd
+    from cube import cube_for_file
+
+    china_exports_file, us_imports_file = input_files(args)
+    dataset = args.dataset
+    cube = cube_for_file(china_exports_file if dataset == 'china_exports' else us_imports_file, dataset)
+    where = dict(parse_condition(text) for text in args.where or [])
+    if args.share:
+        result = cube.share(args.by, args.measure, where)
+    else:
+        result = cube.query(args.by, args.measure, where, args.top)
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(result.to_string(index=False))
+
+def search(args):
+    """latest shipments whose goods description has every word, from the saved search index
+    """
+    import pandas as pd
+    from search import DATASETS, index_for_file
+
+    china_exports_file, us_imports_file = input_files(args)
+    dataset = args.dataset
+    index = index_for_file(china_exports_file if dataset == 'china_exports' else us_imports_file, dataset)
+    result = index.search(' '.join(args.words), args.top, args.field, args.prefix)[DATASETS[dataset]['show']]
+    if 'Goods Shipped' in result:
+        result = result.assign(**{'Goods Shipped': result['Goods Shipped'].str.split('\n').str[0]})
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(result.to_string(index=False))
+
+def merge(args):
+    """write the rows of the page files of one download to one csv, each row once
+    """
+    from pages import merge_pages
+
+    stats = merge_pages(args.pages, args.output, args.chunksize or 100000)
+    print('%(rows)d rows of %(pages)d pages written, %(duplicates)d duplicate rows dropped' % stats)
+
+def list_slides(args):
+    from template import SLIDES
+
+    for key, slide_number in SLIDES.items():
+        print('%2d  %s' % (slide_number, key))
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Build Panjiva trade reports.')
+    commands = arg_parser.add_subparsers(dest='command')
+    commands.required = True
+
+    command = commands.add_parser('build', help='build the pptx report')
+    add_input_arguments(command)
+    command.add_argument('--output', default='test.pptx')
+    command.add_argument('--template', default='template.pptx')
+    command.add_argument('--chunksize', type=int, default=None,
+                         help='stream the csv files this many rows at a time')
+    command.add_argument('--workers', type=int, default=None, help='threads computing slide data')
+    command.add_argument('--no-map', action='store_true',
+                         help='leave out the world map slide, and geopandas with it')
+    command.add_argument('--skip', action='append', metavar='SLIDE', help='leave out a slide, see `slides`')
+    command.add_argument('--cube', action='store_true', help='read from the saved aggregate cubes, see cube.py')
+    command.add_argument('--no-chart-workbooks', action='store_true',
+                         help="keep the template data in the charts' embedded workbooks (Edit Data), saving their rewrite")
+    command.set_defaults(func=build)
+
+    command = commands.add_parser('export', help='write the numbers of the report, without the deck')
+    add_input_arguments(command)
+    command.add_argument('--format', choices=sorted(EXPORT_OUTPUTS), default='json')
+    command.add_argument('--output', default=None,
+                         help='file (json, xlsx) or folder (csv); report.json, report.xlsx or tables by default')
+    command.add_argument('--chunksize', type=int, default=None)
+    command.add_argument('--workers', type=int, default=None, help='threads computing slide data')
+    command.add_argument('--skip', action='append', metavar='SLIDE')
+    command.add_argument('--cube', action='store_true')
+    command.set_defaults(func=export)
+
+    command = commands.add_parser('query', help='sum a measure by some columns, from the aggregate cube')
+    add_input_arguments(command)
+    command.add_argument('--dataset', choices=['china_exports', 'us_imports'], default='us_imports')
+    command.add_argument('--by', action='append', default=[], metavar='COLUMN',
+                         help='group by this column, e.g. year, month, Consignee, Shipment Destination')
+    command.add_argument('--measure', default=None,
+                         help='column to sum, e.g. "Value of Goods (USD)"; the number of shipments by default')
+    command.add_argument('--where', action='append', metavar='CONDITION',
+                         help="COLUMN=VALUE, COLUMN=A|B or COLUMN^=PREFIX, e.g. 'HS Code^=7323' year=2018 month=2018-05")
+    command.add_argument('--top', type=int, default=None, help='only the largest groups')
+    command.add_argument('--share', action='store_true', help='share of the --where rows in each group')
+    command.set_defaults(func=query)
+
+    command = commands.add_parser('search', help='latest shipments matching some words, from the search index')
+    add_input_arguments(command)
+    command.add_argument('words', nargs='*', help='words of the goods description; the latest shipments when none')
+    command.add_argument('--dataset', choices=['china_exports', 'us_imports'], default='us_imports')
+    command.add_argument('--field', action='append', metavar='COLUMN',
+                         help="text column to search, e.g. 'HS Code Keywords'; all of the dataset's by default")
+    command.add_argument('--prefix', action='store_true', help="match words by their start, e.g. tumbler -> tumblers")
+    command.add_argument('--top', type=int, default=10)
+    command.set_defaults(func=search)
+
+    command = commands.add_parser('validate', help='check the csv files can be read')
+    add_input_arguments(command)
+    command.add_argument('--chunksize', type=int, default=None)
+    command.set_defaults(func=validate)
+
+    command = commands.add_parser('merge', help='merge the page files of one download into one csv')
+    command.add_argument('pages', nargs='+', metavar='CSV', help='page files, in order')
+    command.add_argument('--output', required=True)
+    command.add_argument('--chunksize', type=int, default=None)
+    command.set_defaults(func=merge)
+
+    command = commands.add_parser('slides', help='list the slides of the report')
+    command.set_defaults(func=list_slides)
+
+    args = arg_parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""Resolve the spelling variants of a consignee to one buyer.
+
+Panjiva records the consignee as typed on the bill of lading, so one buyer shows up
+as 'Takeya Usa Corp.', 'TAKEYA USA CORPORATION' or 'Base Brands Llc 100 Main Street'.
+Names are first normalized (case, punctuation, legal suffixes, trailing street
+addresses); names whose normalized forms are equal or that share a D-U-N-S number
+form a group. Groups are then taken from the most shipped on, and each joins the
+most similar earlier representative with the same numbers ('Store 12' never joins
+'Store 13') and character trigrams at least THRESHOLD alike, or becomes a
+representative itself. Names are only compared with representatives, so similar
+names do not chain into one cluster.
+
+Representatives are found without comparing every pair: each is indexed under its
+rarest trigrams only (prefix filtering), and a name can only reach the Jaccard
+threshold with a representative sharing one of those. Blocks are kept per set of
+numbers and hold at most MAX_BLOCK names, so the work stays near-linear in the
+number of distinct names.
+"""
+import hashlib
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from atomic import atomic_path
+from ingest import CACHE_DIR
+
+# bump when normalization or clustering changes, so cached resolutions are ignored
+RESOLUTION_VERSION = '2'
+THRESHOLD = 0.6
+MAX_BLOCK = 8
+# resolutions kept in memory, e.g. the full history and the last 12 months of a few reports
+MEMORY_CACHE_SIZE = 16
+
+# words dropped from names; country words ('usa') are kept, 'Acme Usa' and 'Acme Corp' can be different buyers
+LEGAL_SUFFIXES = {
+    'llc', 'inc', 'incorporated', 'co', 'corp', 'corporation', 'company', 'ltd', 'limited',
+    'lp', 'llp', 'plc', 'gmbh', 'sa', 'srl', 'bv', 'pty', 'the', 'dba',
+}
+STREET_WORDS = (
+    'street|st|avenue|ave|road|rd|boulevard|blvd|drive|dr|lane|ln|way|suite|ste|floor|fl|'
+    'highway|hwy|parkway|pkwy|court|ct|place|pl|unit|building|bldg'
+)
+# a house number followed by a street word within a few words, up to the end of the name
+ADDRESS = re.compile(r'\s\d+\w*\s+(?:[a-z]+\s+){0,3}?(?:%s)\b.*$|\s(?:po box|p o box)\b.*$' % STREET_WORDS)
+NOT_ALPHANUMERIC = re.compile(r'[^a-z0-9]+')
+
+_memory_cache = OrderedDict()
+_memory_lock = threading.Lock()
+
+
+def normalize_name(name):
+    """lowercase name without punctuation, legal suffixes or a trailing street address, e.g.
+    'Base Brands, LLC 100 Main Street' -> 'base brands'
+    """
+    text = str(name).lower().replace('&', ' and ').replace("'", '')
+    text = NOT_ALPHANUMERIC.sub(' ', text).strip()
+    text = ADDRESS.sub('', ' ' + text).strip()
+    tokens = [token for token in text.split() if token not in LEGAL_SUFFIXES]
+    # a name made only of suffixes ('The Company') is kept as it is
+    return ' '.join(tokens) or text
+
+def trigrams(text):
+    """character trigrams of a normalized name, padded so short names have some
+    """
+    text = ' %s ' % text
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def numbers(text):
+    """the tokens with digits of a normalized name, e.g. 'store 12 b2' -> ('12', 'b2')
+    """
+    return tuple(sorted(token for token in text.split() if any(char.isdigit() for char in token)))
+
+class clusters:
+    """union-find over the distinct names
+    """
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, i, j):
+        i, j = self.find(i), self.find(j)
+        if i != j:
+            self.parent[max(i, j)] = min(i, j)
+
+    def labels(self):
+        return np.array([self.find(i) for i in range(len(self.parent))])
+
+
+def representative_matches(keys, threshold=THRESHOLD, max_block=MAX_BLOCK):
+    """(i, j) pairs matching a key to the earlier representative key j it is most similar
+    to, among those with the same numbers and a trigram Jaccard similarity of at least
+    threshold. Keys without a match become representatives, matched keys never do.
+    """
+    grams = [trigrams(key) for key in keys]
+    frequency = Counter(gram for key_grams in grams for gram in key_grams)
+    index = {}
+    for i, key_grams in enumerate(grams):
+        key_numbers = numbers(keys[i])
+        ordered = sorted(key_grams, key=lambda gram: (frequency[gram], gram))
+        # a pair reaching the threshold shares at least one of the first `prefix` rarest trigrams
+        prefix = ordered[:len(ordered) - int(math.ceil(threshold * len(ordered))) + 1]
+        candidates = set()
+        for gram in prefix:
+            candidates.update(index.get((key_numbers, gram), ()))
+        best, best_score = None, threshold
+        for j in sorted(candidates):
+            # the Jaccard similarity is at most the ratio of the sizes
+            if min(len(key_grams), len(grams[j])) < threshold * max(len(key_grams), len(grams[j])):
+                continue
+            shared = len(key_grams & grams[j])
+            score = shared / (len(key_grams) + len(grams[j]) - shared)
+            if score > best_score or (best is None and score >= best_score):
+                best, best_score = j, score
+        if best is not None:
+            yield i, best
+            continue
+        for gram in prefix:
+            block = index.setdefault((key_numbers, gram), [])
+            if len(block) < max_block:
+                block.append(i)
+
+def cluster_names(names, duns=None, threshold=THRESHOLD, max_block=MAX_BLOCK):
+    """cluster label (the position of its first name) of each of the distinct names,
+    ordered from the most shipped; duns is an optional list of (name position,
+    D-U-N-S number) links
+    """
+    keys = [normalize_name(name) for name in names]
+    found = clusters(len(keys))
+
+    # equal normalized names
+    first = {}
+    for i, key in enumerate(keys):
+        found.union(first.setdefault(key, i), i)
+    # the same D-U-N-S number
+    first = {}
+    for i, number in duns or []:
+        found.union(first.setdefault(number, i), i)
+    # similar groups, each compared by the key of its most shipped name
+    groups = sorted({found.find(i) for i in range(len(keys))})
+    for group, representative in representative_matches([keys[i] for i in groups], threshold, max_block):
+        found.union(groups[representative], groups[group])
+    return found.labels()
+
+def resolution_key(counts, links, threshold):
+    """hash of the distinct names, their D-U-N-S links and the settings
+    """
+    digest = hashlib.sha1((RESOLUTION_VERSION + repr(threshold)).encode())
+    digest.update(pd.util.hash_pandas_object(counts['Consignee'], index=False).to_numpy().tobytes())
+    digest.update(pd.util.hash_pandas_object(links, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def resolve(counts, links=None, threshold=THRESHOLD, cache_dir=CACHE_DIR):
+    """Series mapping each consignee name of counts to the name of its cluster.
+
+    counts has one row per distinct 'Consignee' with its 'Number of Shipments';
+    links has 'Consignee' and 'Consignee D-U-N-S®' pairs. A cluster is named after
+    its most shipped variant. Results are cached in memory and in cache_dir by the
+    content of the names, so each dataset is resolved once.
+    """
+    counts = counts.dropna(subset=['Consignee'])
+    counts = counts.assign(Consignee=counts['Consignee'].astype(str)).sort_values(
+        by=['Number of Shipments', 'Consignee'], ascending=[False, True], kind='mergesort')
+    if links is None:
+        links = pd.DataFrame({'Consignee': [], 'Consignee D-U-N-S®': []})
+    links = links.dropna().astype(str)
+    links = links[links['Consignee D-U-N-S®'].str.strip() != ''].sort_values(by=['Consignee', 'Consignee D-U-N-S®'])
+
+    key = resolution_key(counts, links, threshold)
+    with _memory_lock:
+        if key in _memory_cache:
+            _memory_cache.move_to_end(key)
+            return _memory_cache[key]
+
+    cache_path = os.path.join(cache_dir, 'consignees-' + key + '.parquet') if cache_dir else None
+    resolved = None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            resolved = pd.read_parquet(cache_path).set_index('Consignee')['Resolved']
+        except ImportError:
+            pass
+
+    if resolved is None:
+        names = counts['Consignee'].tolist()
+        position = {name: i for i, name in enumerate(names)}
+        duns = [(position[name], number) for name, number
+                in zip(links['Consignee'], links['Consignee D-U-N-S®']) if name in position]
+        labels = cluster_names(names, duns, threshold)
+        # names are ordered by shipments, so the label (the smallest position) is the most shipped variant
+        resolved = pd.Series(np.array(names, dtype=object)[np.asarray(labels, dtype=int)], index=pd.Index(names, name='Consignee'),
+                             name='Resolved')
+        if cache_path:
+            save_resolution(resolved, cache_path)
+
+    with _memory_lock:
+        _memory_cache[key] = resolved
+        if len(_memory_cache) > MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+    return resolved
+
+def save_resolution(resolved, cache_path):
+    os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+    try:
+        with atomic_path(cache_path) as tmp_path:
+            resolved.reset_index().to_parquet(tmp_path, index=False)
+    except ImportError:
+        pass
@@ -0,0 +1,101 @@
+import threading
+
+import pandas as pd
+
+from ingest import load_china_exports, load_us_imports
+from panjiva import get_starting_month, group_totals
+from streaming import stream_china_exports, stream_us_imports
+from tracing import stage
+
+
+class cached_frame:
+    """A shipment DataFrame whose aggregates are computed once and then served from a cache.
+
+    The functions in panjiva.py accept a cached_frame wherever they take a DataFrame,
+    so every table, chart and summary sentence built from the same frame shares
+    one groupby per (group keys, measure).
+    """
+    def __init__(self, df):
+        self.df = df
+        self._totals = {}
+        self._memo = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, cache, key, func):
+        """cache[key], computed once even when slides ask for it from several threads
+        """
+        if key not in cache:
+            with self._lock:
+                lock = self._locks.setdefault(key, threading.Lock())
+            with lock:
+                if key not in cache:
+                    cache[key] = func()
+        return cache[key]
+
+    def totals(self, keys, measure=None):
+        """sum of measure (or number of rows when measure is None) per group of keys
+        """
+        key = (tuple(keys), measure)
+        # callers add and reformat columns in place, so hand out copies
+        return self._cached(self._totals, key, lambda: group_totals(self.df, keys, measure)).copy()
+
+    def memo(self, name, func):
+        """result of func(df), computed once per name
+        """
+        return self._cached(self._memo, name, lambda: func(self.df)).copy()
+
+
+def as_cached(frame):
+    """wrap a DataFrame in a cached_frame; aggregate sources such as
+    streaming.partial_totals are used as they are
+    """
+    if isinstance(frame, pd.DataFrame):
+        return cached_frame(frame)
+    return frame
+
+
+class report_context:
+    """The frames of one report, each wrapped in a cached_frame.
+
+    draw_map=False leaves out the world map image and formatted=False keeps the table
+    values as numbers rather than slide text, e.g. when only the data is exported.
+    """
+    def __init__(self, china_exports, us_imports, us_imports_12, draw_map=True, formatted=True):
+        self.china_exports = as_cached(china_exports)
+        self.us_imports = as_cached(us_imports)
+        self.us_imports_12 = as_cached(us_imports_12)
+        self.draw_map = draw_map
+        self.formatted = formatted
+
+
+def load_frames(china_exports_file, us_imports_file, chunksize=None, cube=False):
+    """china_exports, us_imports and us_imports_12 (the last 12 months) of two Panjiva csv files.
+
+    With a chunksize, the csv files are streamed chunksize rows at a time into
+    per-month totals instead of being loaded whole, see streaming.py. With cube=True
+    the report reads from the saved aggregate cubes of the files, see cube.py.
+    """
+    starting_month = get_starting_month()
+    if cube:
+        from cube import cube_for_file
+        with stage('load china exports cube', file=china_exports_file):
+            china_exports = cube_for_file(china_exports_file, 'china_exports')
+        with stage('load us imports cube', file=us_imports_file):
+            us_imports = cube_for_file(us_imports_file, 'us_imports')
+        us_imports_12 = us_imports.window(starting_month)
+    elif chunksize:
+        with stage('stream china exports', file=china_exports_file):
+            china_exports = stream_china_exports(china_exports_file, chunksize)
+        with stage('stream us imports', file=us_imports_file):
+            us_imports = stream_us_imports(us_imports_file, chunksize)
+        us_imports_12 = us_imports.window(starting_month)
+    else:
+        # only the columns the report needs, with year and month period columns added
+        with stage('load china exports', file=china_exports_file):
+            china_exports = load_china_exports(china_exports_file)
+        with stage('load us imports', file=us_imports_file):
+            us_imports = load_us_imports(us_imports_file)
+        # make recent 12 months df of us_imports
+        us_imports_12 = us_imports[us_imports['month'].ge(starting_month).fillna(False)]
+    return china_exports, us_imports, us_imports_12
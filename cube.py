@@ -0,0 +1,247 @@
+"""Pre-aggregated shipment totals for ad-hoc questions and for the report.
+
+A cube holds one row per combination of its dimensions (month, year, destination,
+HS code, consignee, ...) with the sum of every measure and the number of
+shipments. It is built once from a loaded frame, saved next to the ingest cache and
+then answers questions without reading the csv again:
+
+    exports = cube_for_file('Panjiva-China_Exports-....csv', 'china_exports')
+    exports.query(['year'], 'Value of Goods (USD)', where={'Shipment Destination': 'United States'})
+    exports.share(['month'], 'Value of Goods (USD)', where={'Shipment Destination': 'United States'})
+    exports.query(['Shipment Destination'], where={'month': ['2018-11', '2018-12']})
+
+    imports = cube_for_file('Panjiva-US_Imports-....csv', 'us_imports')
+    imports.query(['Consignee'], where={'HS Code': hs_code_prefix('7323'), 'year': 2018}, top=10)
+
+Months are period codes inside the cube and 'YYYY-MM' in query and share results
+and where conditions. The functions in panjiva.py accept a shipment_cube wherever they take a DataFrame,
+like a context.cached_frame or a streaming.partial_totals.
+"""
+import copy
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from atomic import atomic_folder
+from ingest import CACHE_DIR, file_digest, load_china_exports, load_us_imports
+from panjiva import COUNT, group_totals, weighted_hs_code_counts
+from streaming import RECENT_ROWS
+
+# bump when the dimensions or measures change, so saved cubes are rebuilt
+CUBE_VERSION = '1'
+
+DATASETS = {
+    'china_exports': {
+        'load': load_china_exports,
+        'date_column': 'Shipment Month',
+        'dimensions': ['month', 'year', 'Shipment Destination', 'Country of Sale', 'HS Code', 'HS Code Description'],
+        'measures': ['Value of Goods (USD)'],
+        'recent_rows': 0,
+    },
+    'us_imports': {
+        'load': load_us_imports,
+        'date_column': 'Arrival Date',
+        'dimensions': ['month', 'year', 'Shipment Destination', 'HS Code', 'Consignee', 'Consignee D-U-N-S®'],
+        'measures': ['Number of Containers', 'Weight (kg)'],
+        'recent_rows': RECENT_ROWS,
+    },
+}
+
+
+def month_labels(codes):
+    """'YYYY-MM' of a column of month period codes, e.g. 24220 -> '2018-05'; missing
+    months stay missing
+    """
+    codes = pd.Series(codes)
+    labels = pd.Series(None, index=codes.index, dtype=object)
+    known = codes.notna().to_numpy(dtype=bool)
+    years, months = np.divmod(codes[known].to_numpy(dtype='int64'), 12)
+    labels[known] = ['%04d-%02d' % (year, month + 1) for year, month in zip(years.tolist(), months.tolist())]
+    return labels
+
+def parse_month(text):
+    """period code of a 'YYYY-MM' month, e.g. '2018-05' -> 24220
+    """
+    match = re.fullmatch(r'(\d{4})-(\d{1,2})', str(text).strip())
+    if not match or not 1 <= int(match.group(2)) <= 12:
+        raise ValueError("months are written YYYY-MM, e.g. 2018-05, not %r" % (text,))
+    return int(match.group(1)) * 12 + int(match.group(2)) - 1
+
+def month_condition(condition):
+    """condition on the month column with its 'YYYY-MM' months as period codes
+    """
+    if callable(condition):
+        return condition
+    if isinstance(condition, (list, tuple, set)):
+        return [parse_month(month) if isinstance(month, str) else month for month in condition]
+    return parse_month(condition) if isinstance(condition, str) else condition
+
+def with_month_labels(result):
+    """result with its month column, if any, as 'YYYY-MM'
+    """
+    if 'month' in result:
+        result = result.assign(month=month_labels(result['month']))
+    return result
+
+def hs_code_prefix(prefix):
+    """where condition matching records with any HS code starting with prefix,
+    e.g. hs_code_prefix('7323') matches '9617.00; 7323.93'
+    """
+    prefix = str(prefix)
+    return lambda codes: codes.astype(str).str.split(';').map(
+        lambda parts: any(part.strip().startswith(prefix) for part in parts))
+
+def condition_mask(column, condition):
+    """boolean mask of the rows of column meeting condition: a value, a list of values or
+    a function of a Series returning a mask. Functions on categorical columns are
+    evaluated once per category.
+    """
+    if callable(condition):
+        if hasattr(column, 'cat'):
+            matches = np.asarray(condition(pd.Series(column.cat.categories)), dtype=bool)
+            codes = column.cat.codes.to_numpy()
+            return pd.Series(np.where(codes >= 0, matches[codes], False), index=column.index)
+        return pd.Series(np.asarray(condition(column), dtype=bool), index=column.index)
+    if isinstance(condition, (list, tuple, set)):
+        return column.isin(list(condition)).fillna(False).astype(bool)
+    return column.eq(condition).fillna(False).astype(bool)
+
+
+class shipment_cube:
+    """Sums of measures and shipment counts per combination of dimensions.
+    """
+    def __init__(self, table, dimensions, measures, recent=None, date_column=None):
+        self.table = table
+        self.dimensions = list(dimensions)
+        self.measures = list(measures)
+        self.recent = recent
+        self.date_column = date_column
+        self.start_month = None
+
+    @classmethod
+    def build(cls, df, dimensions, measures, date_column, recent_rows=0):
+        """aggregate a loaded shipment frame; rows with missing dimensions are kept
+        """
+        grouped = df.groupby(dimensions, observed=True, dropna=False)
+        table = grouped[measures].sum()
+        table[COUNT] = grouped.size()
+        recent = None
+        if recent_rows:
+            recent = df.nlargest(recent_rows, date_column, keep='first').reset_index(drop=True)
+        return cls(table.reset_index(), dimensions, measures, recent, date_column)
+
+    def window(self, start_month):
+        """a view of the months from start_month (a period code) on
+        """
+        view = copy.copy(self)
+        view.start_month = start_month
+        return view
+
+    def rows(self, where=None):
+        """the cube rows in the window meeting every condition of where, see condition_mask
+        """
+        table = self.table
+        mask = None
+        if self.start_month is not None:
+            mask = table['month'].ge(self.start_month).fillna(False).astype(bool)
+        for column, condition in (where or {}).items():
+            if column == 'month':
+                condition = month_condition(condition)
+            column_mask = condition_mask(table[column], condition)
+            mask = column_mask if mask is None else mask & column_mask
+        return table if mask is None else table[mask.to_numpy()]
+
+    def query(self, by=(), measure=None, where=None, top=None):
+        """sum of measure (number of shipments when None) per group of `by`, over the rows
+        meeting where; with top, only the top largest groups, largest first
+        """
+        column = measure or COUNT
+        result = group_totals(self.rows(where), list(by), column)
+        if top:
+            result = result.nlargest(top, column, keep='first').reset_index(drop=True)
+        return with_month_labels(result)
+
+    def share(self, by, measure=None, where=None):
+        """measure of the rows meeting where as a share of all rows, per group of `by`
+        """
+        column = measure or COUNT
+        part = self.totals(by, measure, where).rename(columns={column: 'Part'})
+        total = self.totals(by, measure).rename(columns={column: 'Total'})
+        result = total.merge(part, how='left', on=list(by)).fillna({'Part': 0})
+        result['Share'] = result['Part'] / result['Total']
+        return with_month_labels(result)
+
+    def totals(self, keys, measure=None, where=None):
+        """sum of measure (or number of shipments when measure is None) per group of keys,
+        months as period codes like the loaded frames
+        """
+        return group_totals(self.rows(where), list(keys), measure or COUNT)
+
+    def memo(self, name, func):
+        """results of the derived computations panjiva.py caches on a frame
+        """
+        if name == 'hs_code_counts':
+            counts = group_totals(self.rows(), ['HS Code'], COUNT)
+            hs_counts = weighted_hs_code_counts(counts['HS Code'], counts[COUNT])
+            return hs_counts.rename_axis('HS Code').reset_index(name='Number of Containers')
+        raise KeyError(name + ' is not answered by the cube')
+
+    @property
+    def df(self):
+        """the latest rows, for recent_shipments
+        """
+        return self.recent
+
+    def save(self, path):
+        """write the cube to the folder path, replacing any cube saved there
+        """
+        with atomic_folder(path) as tmp_path:
+            self.table.to_parquet(os.path.join(tmp_path, 'table.parquet'), index=False)
+            if self.recent is not None:
+                self.recent.to_parquet(os.path.join(tmp_path, 'recent.parquet'), index=False)
+            with open(os.path.join(tmp_path, 'cube.json'), 'w') as f:
+                json.dump({'dimensions': self.dimensions, 'measures': self.measures,
+                           'date_column': self.date_column}, f)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, 'cube.json')) as f:
+            meta = json.load(f)
+        recent_path = os.path.join(path, 'recent.parquet')
+        recent = pd.read_parquet(recent_path) if os.path.exists(recent_path) else None
+        return cls(pd.read_parquet(os.path.join(path, 'table.parquet')), meta['dimensions'], meta['measures'],
+                   recent, meta['date_column'])
+
+
+def build_cube(df, dataset):
+    """cube of a loaded China Exports or US Imports frame
+    """
+    spec = DATASETS[dataset]
+    return shipment_cube.build(df, spec['dimensions'], spec['measures'], spec['date_column'], spec['recent_rows'])
+
+def cube_for_file(path, dataset, cache_dir=CACHE_DIR):
+    """cube of a Panjiva csv, saved in cache_dir and keyed by the file's hash, so it is
+    built only the first time a download is queried. Without a Parquet engine the cube
+    is built in memory every time.
+    """
+    if not cache_dir:
+        return build_cube(DATASETS[dataset]['load'](path, None), dataset)
+    key = hashlib.sha1((file_digest(path) + CUBE_VERSION + dataset).encode()).hexdigest()
+    cube_path = os.path.join(cache_dir, 'cube-' + key)
+    if os.path.isdir(cube_path):
+        try:
+            return shipment_cube.load(cube_path)
+        except ImportError:
+            pass
+
+    cube = build_cube(DATASETS[dataset]['load'](path, cache_dir), dataset)
+    try:
+        cube.save(cube_path)
+    except ImportError:
+        pass
+    return cube
@@ -0,0 +1,117 @@
+import copy
+import io
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from atomic import atomic_path
+from ingest import CACHE_DIR
+
+# geopandas and matplotlib are imported by the functions drawing the map, so a
+# report built without the map slide never loads them
+
+WORLD_CACHE = 'naturalearth_lowres.parquet'
+
+_lock = threading.Lock()
+_base_map = None
+
+
+def load_world(cache_dir=CACHE_DIR):
+    """naturalearth country polygons, read from the bundled shapefile once and then
+    from a Parquet copy in cache_dir (when a Parquet engine is installed)
+    """
+    import geopandas # make world heat map plot
+
+    cache_path = os.path.join(cache_dir, WORLD_CACHE) if cache_dir else None
+    if cache_path and os.path.exists(cache_path):
+        try:
+            return geopandas.read_parquet(cache_path)
+        except ImportError:
+            pass
+
+    world = geopandas.read_file(geopandas.datasets.get_path('naturalearth_lowres'))
+    world = world[['name', 'geometry']]
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        try:
+            with atomic_path(cache_path) as tmp_path:
+                world.to_parquet(tmp_path)
+        except ImportError:
+            pass
+    return world
+
+def polygon_path(polygon):
+    """matplotlib path of a shapely polygon, holes included
+    """
+    from matplotlib.path import Path
+
+    rings = [polygon.exterior] + list(polygon.interiors)
+    return Path.make_compound_path(*[Path(np.asarray(ring.coords)[:, :2]) for ring in rings])
+
+
+class base_map:
+    """World map drawn once; each report only recolors the countries.
+
+    Every country polygon is one patch of a single collection, so a report sets the
+    collection's values and color limits and saves the figure, without rebuilding
+    geometry or artists.
+    """
+    def __init__(self, world, cmap='Reds'):
+        from matplotlib.collections import PatchCollection
+        from matplotlib.figure import Figure
+        from matplotlib.patches import PathPatch
+
+        self.names = pd.Index(world['name'])
+        paths, owners = [], []
+        for i, geometry in enumerate(world.geometry):
+            polygons = geometry.geoms if hasattr(geometry, 'geoms') else [geometry]
+            for polygon in polygons:
+                paths.append(polygon_path(polygon))
+                owners.append(i)
+        # country of each patch
+        self.owners = np.asarray(owners)
+
+        self.fig = Figure(figsize=(5,3))
+        ax = self.fig.add_subplot(111)
+        self.collection = PatchCollection([PathPatch(path) for path in paths], cmap=cmap)
+        # countries without exports are left blank
+        cmap = copy.copy(self.collection.get_cmap())
+        cmap.set_bad('none')
+        self.collection.set_cmap(cmap)
+        self.collection.set_array(np.ma.masked_all(len(paths)))
+        ax.add_collection(self.collection)
+        ax.autoscale_view()
+        ax.set_aspect('equal')
+        ax.axis('off')
+        self.fig.colorbar(self.collection, ax=ax)
+        self.lock = threading.Lock()
+
+    def render(self, values):
+        """png of the map with countries colored by values, a Series indexed by country name
+        """
+        country_values = values.groupby(level=0).sum().reindex(self.names).to_numpy(dtype='float64')
+        patch_values = np.ma.masked_invalid(country_values[self.owners])
+        image = io.BytesIO()
+        with self.lock:
+            self.collection.set_array(patch_values)
+            if patch_values.count():
+                self.collection.set_clim(patch_values.min(), patch_values.max())
+            self.fig.savefig(image, format='png')
+        image.seek(0)
+        return image
+
+def get_base_map():
+    """the base map of this process, built on first use
+    """
+    global _base_map
+    with _lock:
+        if _base_map is None:
+            _base_map = base_map(load_world())
+    return _base_map
+
+def render_heat_map(values):
+    """in-memory png of the world heat map for values, a Series indexed by country name
+    """
+    return get_base_map().render(values)
@@ -0,0 +1,137 @@
+import hashlib
+import os
+
+import pandas as pd
+
+from atomic import atomic_path
+
+# bump when the column selection or derived columns change, so old caches are ignored
+CACHE_VERSION = '3'
+CACHE_DIR = '.panjiva_cache'
+
+# only the columns the report reads, with their dtypes. The text columns the
+# report groups by are categoricals: one copy of each distinct value plus
+# integer codes per row, and groupbys run on the codes.
+CHINA_EXPORTS_COLUMNS = {
+    'Shipment Month': 'str',
+    'Shipment Destination': 'category',
+    'Country of Sale': 'category',
+    'Value of Goods (USD)': 'float64',
+    'HS Code': 'category',
+    'HS Code Description': 'category',
+}
+
+US_IMPORTS_COLUMNS = {
+    'Arrival Date': 'str',
+    'Consignee': 'category',
+    'Consignee D-U-N-S®': 'category',
+    'Shipment Destination': 'category',
+    'Quantity': 'str',
+    'Weight (kg)': 'float64',
+    'Number of Containers': 'float64',
+    'HS Code': 'category',
+    'Goods Shipped': 'str',
+}
+
+# columns read where the download has them, and left empty otherwise
+OPTIONAL_COLUMNS = {'Consignee D-U-N-S®'}
+
+DATE_FORMAT = '%Y-%m-%d'
+
+
+def file_digest(path, block_size=1 << 20):
+    """sha1 of the file contents, read in blocks so large downloads are not held in memory.
+    """
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def add_periods(df, date_column):
+    """add integer 'year' and 'month' columns derived from a parsed date column.
+    'month' is a period code, see panjiva.month_code; both are missing where the date is.
+    """
+    dates = df[date_column]
+    df['year'] = dates.dt.year.astype('Int16')
+    df['month'] = (dates.dt.year * 12 + dates.dt.month - 1).astype('Int32')
+    return df
+
+def parse_dates(df, date_column):
+    """parse the date column of a freshly read csv and add the period columns
+    """
+    df[date_column] = pd.to_datetime(df[date_column], format=DATE_FORMAT, errors='coerce')
+    return add_periods(df, date_column)
+
+def present_columns(path, columns):
+    """the columns to read from a Panjiva csv: all of columns except the optional ones
+    its header lacks. Missing required columns are left in, so pandas reports them.
+    """
+    header = set(pd.read_csv(path, nrows=0).columns)
+    return [column for column in columns if column in header or column not in OPTIONAL_COLUMNS]
+
+def add_missing_columns(df, columns):
+    """empty columns of the right dtype for the optional columns of a download that lacks them
+    """
+    for column in columns:
+        if column not in df.columns:
+            df[column] = pd.Series(index=df.index, dtype=columns[column])
+    return df
+
+def read_csv(path, columns, date_column):
+    """read only the given columns of a Panjiva csv, with explicit dtypes and date format
+    """
+    df = pd.read_csv(path, usecols=present_columns(path, columns), dtype=columns)
+    return parse_dates(add_missing_columns(df, columns), date_column)
+
+def iter_csv(path, columns, date_column, chunksize):
+    """read a Panjiva csv like read_csv, chunksize rows at a time
+    """
+    for chunk in pd.read_csv(path, usecols=present_columns(path, columns), dtype=columns, chunksize=chunksize):
+        yield parse_dates(add_missing_columns(chunk, columns), date_column)
+
+def load_csv(path, columns, date_column, cache_dir=CACHE_DIR):
+    """read a Panjiva csv, going through a Parquet sidecar keyed by the file's hash.
+
+    The sidecar lives in cache_dir; pass cache_dir=None to always parse the csv.
+    Without a Parquet engine (pyarrow / fastparquet) the cache is skipped.
+    """
+    if not cache_dir:
+        return read_csv(path, columns, date_column)
+
+    key = hashlib.sha1((file_digest(path) + CACHE_VERSION + repr(columns)).encode()).hexdigest()
+    cache_path = os.path.join(cache_dir, key + '.parquet')
+    if os.path.exists(cache_path):
+        try:
+            return pd.read_parquet(cache_path)
+        except ImportError:
+            return read_csv(path, columns, date_column)
+
+    df = read_csv(path, columns, date_column)
+    os.makedirs(cache_dir, exist_ok=True)
+    try:
+        with atomic_path(cache_path) as tmp_path:
+            df.to_parquet(tmp_path, index=False)
+    except ImportError:
+        pass
+    return df
+
+def load_china_exports(path, cache_dir=CACHE_DIR):
+    """load a Panjiva China Exports csv with 'year' and 'month' period columns added
+    """
+    return load_csv(path, CHINA_EXPORTS_COLUMNS, 'Shipment Month', cache_dir)
+
+def load_us_imports(path, cache_dir=CACHE_DIR):
+    """load a Panjiva US Imports csv with 'year' and 'month' period columns added
+    """
+    return load_csv(path, US_IMPORTS_COLUMNS, 'Arrival Date', cache_dir)
+
+def iter_china_exports(path, chunksize):
+    """China Exports csv in chunks of chunksize rows, see load_china_exports
+    """
+    return iter_csv(path, CHINA_EXPORTS_COLUMNS, 'Shipment Month', chunksize)
+
+def iter_us_imports(path, chunksize):
+    """US Imports csv in chunks of chunksize rows, see load_us_imports
+    """
+    return iter_csv(path, US_IMPORTS_COLUMNS, 'Arrival Date', chunksize)
@@ -1,32 +1,36 @@
-from panjiva import *
-from parser import *
+import tracing
+from tracing import stage
+from context import load_frames
+from pages import find_input_files
+from parser import parser
 
-if __name__ == "__main__":
-	files = [f for f in os.listdir('.') if os.path.isfile(f)]
-	for file in files:
-	    if file.endswith('csv') and 'China_Exports' in file:
-	        china_exports_file = file
-	    if file.endswith('csv') and 'US_Imports' in file:
-	        us_imports_file = file
 
-	china_exports = pd.read_csv(china_exports_file, low_memory=False)
-	us_imports = pd.read_csv(us_imports_file, low_memory=False)
-	# add year column
-	china_exports['year'] = pd.DatetimeIndex(china_exports['Shipment Month']).year
-	us_imports['year'] = pd.DatetimeIndex(us_imports['Arrival Date']).year
-	# add month column
-	china_exports['month'] = china_exports['Shipment Month'].str[0:7]
-	us_imports['month'] = us_imports['Arrival Date'].str[0:7]
-	# make recent 12 months df of us_imports
-	starting_month = str(int(str(datetime.today())[:4]) -1) + str(datetime.today())[4:7]
-	us_imports_12 = us_imports[us_imports['month'] >= starting_month]
+def build_report(china_exports_file, us_imports_file, output='test.pptx', template='template.pptx', chunksize=None, workers=None, skip=(), cube=False, chart_workbooks=True):
+	"""load both Panjiva csv files and write the filled-in report to output,
+	a file path or a writable stream. With output=None the pptx is returned as bytes.
+
+	With a chunksize, the csv files are streamed chunksize rows at a time into
+	per-month totals instead of being loaded whole, see streaming.py. With cube=True
+	the saved aggregate cubes of the files are used, see cube.py. The slides of the
+	keys in skip (see slides.REGISTRY) are left out. With chart_workbooks=False the
+	workbooks embedded in the charts keep the template data, see parser.parse_chart.
+	"""
+	china_exports, us_imports, us_imports_12 = load_frames(china_exports_file, us_imports_file, chunksize, cube)
+	return render_report(china_exports, us_imports, us_imports_12, output, template, workers, skip, chart_workbooks)
 
-	parser = parser('template.pptx', china_exports, us_imports, us_imports_12)
-	parser.parse_shipment_destinations()
-	parser.parse_yearly_exports()
-	parser.parse_hs_exports()
-	parser.parse_yearly_imports()
-	parser.parse_hs_imports()
-	parser.parse_consignees_imports()
-	parser.parse_consignees_imports_12()
-	parser.parse_recent_shipments()
+def render_report(china_exports, us_imports, us_imports_12, output='test.pptx', template='template.pptx', workers=None, skip=(), chart_workbooks=True):
+	"""fill in the template from loaded frames (or aggregate sources) and save it to output.
+	The slide data is computed on `workers` threads, see slides.build_slides.
+	"""
+	with stage('load template'):
+	    report = parser(template, china_exports, us_imports, us_imports_12, chart_workbooks)
+	# slide data is computed concurrently, the slides are filled in order, see slides.py
+	report.parse_all(workers=workers, skip=skip)
+	return report.save(output)
+
+if __name__ == "__main__":
+	china_exports_file, us_imports_file = find_input_files('.')
+	build_report(china_exports_file, us_imports_file)
+	# PANJIVA_TRACE=trace.json python3 main.py
+	if tracing.is_enabled():
+	    print('trace written to ' + tracing.write())
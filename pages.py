@@ -0,0 +1,165 @@
+"""Assemble a download split over several Panjiva page files.
+
+Panjiva caps the rows of one download, so a long history arrives as several files
+(...-results_1_to_5000_of_12000..., ...-results_5001_to_10000_of_12000..., ...),
+which overlap when pages are pulled again. merge_pages streams the pages into one
+csv, chunk by chunk, dropping the rows already written from an earlier page.
+
+Rows are recognized by a 64-bit hash of their content. The hashes seen so far are
+kept in a hash_index, 8 bytes per distinct row, so the memory used is a small
+fraction of the rows themselves. Identical rows within one page are kept, as they
+may be separate shipments; only rows repeated from another page are dropped.
+"""
+import hashlib
+import os
+import re
+
+from atomic import atomic_path
+
+# ingest.CACHE_DIR; pandas and numpy (and ingest) are imported where rows are read,
+# so finding the pages in batch.py does not load them
+CACHE_DIR = '.panjiva_cache'
+
+# e.g. Panjiva-China_Exports-zhejiang_everich-results_1_to_4285_of_4285-....csv
+PAGE_PATTERN = re.compile(
+    r'Panjiva-(China_Exports|US_Imports)-(.+?)-results(?:_(\d+)_to_(\d+)_of_(\d+))?', re.IGNORECASE)
+CHUNKSIZE = 100000
+DATASETS = ('china_exports', 'us_imports')
+
+
+def page_info(file):
+    """(dataset, company, first row) of a Panjiva file name, or None when it is not one.
+    Files only containing China_Exports or US_Imports in their name belong to company ''.
+    """
+    if not file.endswith('csv'):
+        return None
+    match = PAGE_PATTERN.match(file)
+    if match:
+        first_row = int(match.group(3)) if match.group(3) else 0
+        return match.group(1).lower(), match.group(2).lower(), first_row
+    for dataset in ('China_Exports', 'US_Imports'):
+        if dataset in file:
+            return dataset.lower(), '', 0
+    return None
+
+def find_pages(directory):
+    """{company: {'china_exports': [paths], 'us_imports': [paths]}} of the csv files in
+    directory, the pages of each download ordered by their first row
+    """
+    found = {}
+    for file in sorted(os.listdir(directory)):
+        path = os.path.join(directory, file)
+        info = page_info(file)
+        if info is None or not os.path.isfile(path):
+            continue
+        dataset, company, first_row = info
+        found.setdefault(company, {}).setdefault(dataset, []).append((first_row, path))
+    return {company: {dataset: [path for _, path in sorted(pages)] for dataset, pages in datasets.items()}
+            for company, datasets in found.items()}
+
+
+class hash_index:
+    """A set of 64-bit row hashes stored as a few sorted numpy arrays.
+
+    Each add() makes a new sorted array, merged with the last one while that is not
+    larger, so there are O(log n) arrays to search and no per-row python objects.
+    """
+    def __init__(self):
+        self.levels = []
+
+    def __len__(self):
+        return sum(len(level) for level in self.levels)
+
+    def contains(self, hashes):
+        """boolean mask of the hashes already in the index
+        """
+        import numpy as np
+
+        found = np.zeros(len(hashes), dtype=bool)
+        for level in self.levels:
+            positions = np.minimum(np.searchsorted(level, hashes), len(level) - 1)
+            found |= level[positions] == hashes
+        return found
+
+    def add(self, hashes):
+        import numpy as np
+
+        level = np.unique(np.asarray(hashes, dtype='uint64'))
+        if not len(level):
+            return self
+        while self.levels and len(self.levels[-1]) <= len(level):
+            level = np.union1d(self.levels.pop(), level)
+        self.levels.append(level)
+        return self
+
+
+def row_hashes(chunk):
+    import pandas as pd
+
+    return pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+
+def merge_pages(paths, output, chunksize=CHUNKSIZE):
+    """write the rows of the page files of one download to the csv output, each row once.
+
+    The pages must share their columns (in any order); the output has those of the
+    first page. Returns {'pages', 'rows', 'duplicates'} counts.
+    """
+    import numpy as np
+    import pandas as pd
+
+    index = hash_index()
+    columns = None
+    stats = {'pages': len(paths), 'rows': 0, 'duplicates': 0}
+    with atomic_path(output) as tmp_path, open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        for path in paths:
+            page_hashes = []
+            # every column as the text of the file, so equal rows hash equally
+            for chunk in pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunksize):
+                if columns is None:
+                    columns = list(chunk.columns)
+                    chunk.iloc[:0].to_csv(f, index=False)
+                missing = [column for column in columns if column not in chunk.columns]
+                if missing:
+                    raise ValueError('%s lacks the columns %s of the first page' % (path, ', '.join(missing)))
+                chunk = chunk[columns]
+                hashes = row_hashes(chunk)
+                new = ~index.contains(hashes)
+                stats['rows'] += int(new.sum())
+                stats['duplicates'] += int(len(new) - new.sum())
+                chunk[new].to_csv(f, header=False, index=False)
+                page_hashes.append(hashes[new])
+            # added once the page is done, so repeats within the page are kept
+            if page_hashes:
+                index.add(np.concatenate(page_hashes))
+    return stats
+
+def consolidate(paths, cache_dir=CACHE_DIR, chunksize=CHUNKSIZE):
+    """one csv with the rows of all pages: the page itself when there is one, otherwise
+    a merged file in cache_dir, kept for as long as the pages are unchanged
+    """
+    if isinstance(paths, str):
+        return paths
+    if len(paths) == 1:
+        return paths[0]
+    key = hashlib.sha1(repr([(os.path.abspath(path), os.path.getsize(path), os.path.getmtime(path))
+                             for path in paths]).encode()).hexdigest()
+    output = os.path.join(cache_dir or '.', 'pages-%s.csv' % key)
+    if not os.path.exists(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        merge_pages(paths, output, chunksize)
+    return output
+
+def find_input_files(directory='.', cache_dir=CACHE_DIR, datasets=DATASETS):
+    """the China Exports and US Imports csv of the company in directory, each assembled
+    from all of its pages; None for a missing dataset or one not in datasets, which
+    is not looked for
+    """
+    if not datasets:
+        return (None,) * len(DATASETS)
+    companies = find_pages(directory)
+    if len(companies) > 1:
+        raise ValueError('files of several companies in %s (%s), see batch.py'
+                         % (directory, ', '.join(sorted(companies))))
+    found = next(iter(companies.values()), {})
+    return tuple(consolidate(found[dataset], cache_dir) if dataset in found and dataset in datasets else None
+                 for dataset in DATASETS)
@@ -2,12 +2,93 @@ import pandas as pd
 import numpy as np
 import os
 from datetime import datetime
+from functools import lru_cache
 import warnings
+
+from tracing import traced
+from consignees import resolve
+
 warnings.filterwarnings("ignore")
 
 
+COUNT = 'Number of Shipments'
+# every (group keys, measure) total the report reads from each frame, us_imports
+# covering us_imports_12 as well; see streaming.partial_totals
+REPORT_TOTALS = {
+    'china_exports': [
+        (['month'], 'Value of Goods (USD)'),
+        ([], 'Value of Goods (USD)'),
+        (['Country of Sale'], None),
+        (['HS Code'], None),
+        (['Shipment Destination'], 'Value of Goods (USD)'),
+        (['year'], 'Value of Goods (USD)'),
+        (['Shipment Destination', 'year'], 'Value of Goods (USD)'),
+        (['HS Code', 'HS Code Description'], 'Value of Goods (USD)'),
+    ],
+    'us_imports': [
+        (['year'], None),
+        (['year'], 'Number of Containers'),
+        (['month'], None),
+        (['month'], 'Number of Containers'),
+        (['Consignee'], None),
+        (['Consignee', 'Consignee D-U-N-S®'], None),
+    ],
+}
+HS_LOOKUP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hs_lookup.csv')
+
+
+def group_totals(df, keys, measure=None):
+    """sum measure (or count rows when measure is None) for each group of keys.
+    With no keys a single row with the grand total is returned.
+    """
+    name = measure or COUNT
+    if not keys:
+        value = len(df) if measure is None else df[measure].sum()
+        return pd.DataFrame({name: [value]})
+    grouped = df.groupby(list(keys), observed=True)
+    if measure is None:
+        return grouped.size().reset_index(name=COUNT)
+    return grouped[measure].sum().reset_index()
+
+def totals(frame, keys, measure=None):
+    """group totals of a DataFrame, or served from the cache of a context.cached_frame
+    """
+    if isinstance(frame, pd.DataFrame):
+        return group_totals(frame, keys, measure)
+    return frame.totals(keys, measure)
+
+def rows(frame):
+    """the underlying DataFrame of a DataFrame or context.cached_frame
+    """
+    if isinstance(frame, pd.DataFrame):
+        return frame
+    return frame.df
+
+def month_code(dt):
+    """integer period code of the month of a date: months since year 0, e.g. May 2018 -> 24220
+    """
+    return dt.year * 12 + dt.month - 1
+
+def get_starting_month():
+    """period code of the first month of the recent 12 months, this month a year ago
+    """
+    return month_code(datetime.today()) - 12
+
+def month_start(code):
+    """first day of the month of a period code
+    """
+    code = int(code)
+    return datetime(code // 12, code % 12 + 1, 1)
+
+def reindex_periods(df, column, periods):
+    """keep the rows of the given years / month codes, in order, with 0 for missing periods
+    """
+    df = df.dropna(subset=[column])
+    df[column] = df[column].astype('int64')
+    return df.set_index(column).reindex(list(periods), fill_value=0).rename_axis(column).reset_index()
+
 def transform_month(month):
-    dt = datetime.strptime(month, '%Y-%m')
+    dt = month_start(month)
     return dt.strftime("%B") + ' ' + dt.strftime("%Y") 
 
 def fill_missing_intervals(df, interval):
@@ -33,56 +114,54 @@ def fill_missing_intervals(df, interval):
     df = df.reset_index().rename(columns={'index': interval})
     return df
 
-def add_percentage(df, col_value, col_percentage):
-    """add a percentage column with respective to col_value
+def format_percentages(shares):
+    """percentages rounded to 2 decimals as text, e.g. 12.3456 -> '12.35%'
     """
-    df[col_percentage] = df[col_value] / df[col_value].sum()
-    df[col_percentage] = df[col_percentage]*100
-    df[col_percentage] = df[col_percentage].round(2)
-    df[col_percentage] = df[col_percentage].astype('str')
-    df[col_percentage] = df[col_percentage] + '%'
-    return df
+    return [str(share) + '%' for share in np.round(shares, 2).tolist()]
 
-def show_sorted_top_n(df, col, n):
-    """only keep top-n records in the table and assign all others to 'others', and add a total row.
-    """
-    top_df = df[:n]
-    total_value = df[col].sum()
-    others_value = total_value - top_df[col].sum()
-    others_percentage = str((others_value / total_value * 100).round(2)) + '%'
-    df_to_append = pd.DataFrame(
-            [['Others', others_value, others_percentage], ['Total', total_value, '100%']], 
-            columns=df.columns)
-    
-    top_df = top_df.append(df_to_append)
-    top_df[col] = top_df[col].astype('int')
-    return top_df
+def top_n_table(df, keys, value, n, percentage=None, thousands=False, formatted=True):
+    """the n rows of df with the largest value, then an 'Others' row with the rest and a 'Total' row, e.g.
 
-def show_sorted_top_n_extra(df, col, n):
-    """only keep top-n records in the table and assign all others to 'others', and add a total row.
-    """
-    top_df = df[:n]
-    total_value = df[col].sum()
-    others_value = total_value - top_df[col].sum()
-    others_percentage = str((others_value / total_value * 100).round(2)) + '%'
-    df_to_append = pd.DataFrame(
-            [['Others', 'Others', others_value, others_percentage], 
-            ['Total', 'Total', total_value, '100%']], 
-            columns=df.columns)
-    
-    top_df = top_df.append(df_to_append)
-    top_df[col] = top_df[col].astype('int')
-    return top_df
+    Shipment Destination, Value of Goods (USD), Percentage of Sale
+    United States, 808080, 60.0%
+    ...
+    Others, 80, 20.0%
+    Total, 10000000, 100%
 
+    keys are the label columns, set to 'Others' / 'Total' in the added rows. The top
+    rows are selected with nlargest rather than by sorting all groups. Values are
+    truncated to integers, written with thousands separators when thousands is set,
+    and percentage names a column with each row's share of the total. With
+    formatted=False values and percentages are left as unrounded numbers.
+    """
+    top = df.nlargest(n, value, keep='first')
+    total = df[value].sum()
+    values = np.append(top[value].to_numpy(dtype='float64'), [total - top[value].sum(), total])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shares = values / total * 100
+
+    table = pd.DataFrame({key: np.append(top[key].to_numpy(dtype=object), ['Others', 'Total']) for key in keys})
+    if not formatted:
+        table[value] = values
+    else:
+        values = values.astype('int64')
+        table[value] = [format(v, ',') for v in values.tolist()] if thousands else values
+    if percentage:
+        table[percentage] = format_percentages(shares[:-1]) + ['100%'] if formatted else shares
+    return table
+
+@traced
 def exports_summary_sentences(china_exports):
     """print summary sentences
     """
-    min_month = transform_month(china_exports['month'].min())
-    max_month = transform_month(china_exports['month'].max())
-    value_m = china_exports['Value of Goods (USD)'].sum()/ 1e6
+    months = totals(china_exports, ['month'], 'Value of Goods (USD)')
+    min_month = transform_month(months['month'].min())
+    max_month = transform_month(months['month'].max())
+    value_m = totals(china_exports, [], 'Value of Goods (USD)')['Value of Goods (USD)'].sum()/ 1e6
     value_m = str(round(value_m, 2))
-    number_of_countries = len(china_exports['Country of Sale'].unique())
-    number_of_hs = len(china_exports['HS Code'].unique())
+    number_of_countries = totals(china_exports, ['Country of Sale']).shape[0]
+    number_of_hs = totals(china_exports, ['HS Code']).shape[0]
 
     text1 = 'The china exports for the last 5 years (2013 - 2017) showed that '
     text2 = 'the products were exported to ' + str(number_of_countries) + ' regions'
@@ -90,7 +169,8 @@ def exports_summary_sentences(china_exports):
     text4 = 'and valued at ' + str(value_m) + ' million USD.'
     return text1 + text2 + text3 + text4
 
-def shipment_destinations(china_exports):
+@traced
+def shipment_destinations(china_exports, formatted=True):
     """show top n, e.g. 
     shipment destination, Value of Goods(USD), Percentage of Sale
     United States, 808080, 60.00%
@@ -98,126 +178,144 @@ def shipment_destinations(china_exports):
     Others, 80, 20.00%
     Total, 10000000, 100%
     """
-    shipment_destinations = china_exports.groupby(['Shipment Destination']).agg(
-        {"Value of Goods (USD)": np.sum}).reset_index().sort_values(
-        by=['Value of Goods (USD)'], ascending=False)
-
-    shipment_destinations = add_percentage(shipment_destinations,
-                            'Value of Goods (USD)', 'Percentage of Sale')
-
-    shipment_destinations = show_sorted_top_n(shipment_destinations, 
-        'Value of Goods (USD)', 10)
+    shipment_destinations = totals(china_exports, ['Shipment Destination'], 'Value of Goods (USD)')
+    return top_n_table(shipment_destinations, ['Shipment Destination'], 'Value of Goods (USD)', 10,
+                       'Percentage of Sale', thousands=True, formatted=formatted)
 
-    shipment_destinations['Value of Goods (USD)'] = shipment_destinations['Value of Goods (USD)'].apply(lambda x: format(x,','))
-    
-    return shipment_destinations
-
-def yearly_exports(china_exports):
+@traced
+def yearly_exports(china_exports, formatted=True):
     """yearly export values from China for the last 5 years (2018)
     """
-    yearly_exports = china_exports.groupby(['year']).agg(
-        {"Value of Goods (USD)": np.sum}).reset_index()
-    us_exports = china_exports[china_exports['Shipment Destination'] == 'United States'].groupby(
-        ['year']).agg({"Value of Goods (USD)": np.sum}).reset_index()
+    yearly_exports = totals(china_exports, ['year'], 'Value of Goods (USD)')
+    us_exports = totals(china_exports, ['Shipment Destination', 'year'], 'Value of Goods (USD)')
+    us_exports = us_exports[us_exports['Shipment Destination'] == 'United States'][['year', 'Value of Goods (USD)']]
     yearly_exports = yearly_exports.merge(us_exports, how='left', on='year')
     yearly_exports.columns = ['year', 'Total', 'US']
-    yearly_exports['year'] = yearly_exports['year'].astype('str')
-    full_df = pd.DataFrame(np.zeros((5, 1)), columns=['year'])
-    full_df['year'] = pd.date_range(end='2018-01-01', periods=5, freq='Y')
-    full_df['year'] = full_df['year'].astype('str')
-    full_df['year'] = full_df['year'].str[:4]
-    yearly_exports = full_df.merge(yearly_exports, how='left', on='year')
     yearly_exports = yearly_exports.fillna(0)
+    # the 5 years from 2013 to 2017
+    yearly_exports = reindex_periods(yearly_exports, 'year', range(2013, 2018))
+    if formatted:
+        yearly_exports['year'] = yearly_exports['year'].astype('str')
     return yearly_exports
 
-def hs_exports(china_exports):
+@traced
+def hs_exports(china_exports, formatted=True):
     """summary by hs codes
     """
-    hs_exports = china_exports.groupby(['HS Code','HS Code Description']).agg(
-        {"Value of Goods (USD)": np.sum}).reset_index().sort_values(
-    by=['Value of Goods (USD)'], ascending=False)
-
-    hs_exports = add_percentage(hs_exports, 'Value of Goods (USD)', 
-                                'Percentage of Sale')
-    hs_exports = show_sorted_top_n_extra(hs_exports, 
-                             'Value of Goods (USD)', 5)
+    hs_exports = totals(china_exports, ['HS Code','HS Code Description'], 'Value of Goods (USD)')
+    hs_exports = top_n_table(hs_exports, ['HS Code', 'HS Code Description'], 'Value of Goods (USD)', 5,
+                             'Percentage of Sale', thousands=True, formatted=formatted)
     hs_exports['HS Code'] = hs_exports['HS Code'].astype('str')
-    hs_exports['Value of Goods (USD)'] = hs_exports['Value of Goods (USD)'].apply(lambda x: format(x,','))
     return hs_exports
 
+@traced
 def hs_exports_summary_sentence(china_exports):
     """summary sentence for hs exports data.
     """
-    hs_exports = china_exports.groupby(['HS Code','HS Code Description']).agg(
-        {"Value of Goods (USD)": np.sum}).reset_index().sort_values(
-    by=['Value of Goods (USD)'], ascending=False)
+    hs_exports = totals(china_exports, ['HS Code','HS Code Description'], 'Value of Goods (USD)')
     number_of_hs = hs_exports.shape[0]
     text1 = 'The China export records for the last 5 years (2013 - 2017) showed that '
     text2 = 'a total of ' + str(number_of_hs) + ' of 6-digit HS Code were exported.'
     return text1 + text2
 
+@traced
 def yearly_imports_summary_sentence(us_imports):
     '''summary sentence for yearly imports data
     '''
-    us_shipments = us_imports.groupby(['year']).size().reset_index(name='Number of Shipments')
-    us_containers = us_imports.groupby(['year']).agg({"Number of Containers": np.sum}).reset_index()
+    us_shipments = totals(us_imports, ['year'])
+    us_containers = totals(us_imports, ['year'], 'Number of Containers')
     number_of_shipments = us_shipments['Number of Shipments'].sum() 
     number_of_containers = us_containers['Number of Containers'].sum()
     text1 = 'The US import records for the last 5 years showed that '
-    text2 = str(number_of_shipments) +' shipments and ' + str(number_of_containers) + ' containers were imported to US.'
+    text2 = str(number_of_shipments) +' shipments and ' + str(int(number_of_containers)) + ' containers were imported to US.'
     return text1 + text2
 
-def yearly_imports(us_imports):
+@traced
+def yearly_imports(us_imports, formatted=True):
     '''yearly import values to US for the last 5 years
     '''
-    us_shipments = us_imports.groupby(['year']).size().reset_index(name='Number of Shipments')
-    us_containers = us_imports.groupby(['year']).agg({"Number of Containers": np.sum}).reset_index()
+    us_shipments = totals(us_imports, ['year'])
+    us_containers = totals(us_imports, ['year'], 'Number of Containers')
     yearly_imports = us_shipments.merge(us_containers, how='left', on='year')
-    yearly_imports['year'] = yearly_imports['year'].astype('str')
-    # make an empty df
-    full_df = pd.DataFrame(np.zeros((6, 1)), columns=['year'])
-    full_df['year'] = pd.date_range(end=datetime.now(), periods=6, freq='YS')
-    full_df['year'] = full_df['year'].astype('str')
-    full_df['year'] = full_df['year'].str[:4]
-    yearly_imports = full_df.merge(yearly_imports, how='left', on='year')
     yearly_imports = yearly_imports.fillna(0)
-    # estimate current year full 12 months data
+    # the current year and the 5 before it
+    current_year = datetime.now().year
+    yearly_imports = reindex_periods(yearly_imports, 'year', range(current_year - 5, current_year + 1))
+    if formatted:
+        yearly_imports['year'] = yearly_imports['year'].astype('str')
+    # estimate current year full 12 months data, in floats as the counts may be integers
     modifying_ratio = 12 / datetime.now().month
-    yearly_imports.loc[yearly_imports.index[-1], 'Number of Shipments'] *= modifying_ratio
-    yearly_imports.loc[yearly_imports.index[-1], 'Number of Containers'] *= modifying_ratio
-    yearly_imports['Number of Shipments'] = yearly_imports['Number of Shipments'].astype('int')
-    yearly_imports['Number of Containers'] = yearly_imports['Number of Containers'].astype('int')
+    for column in ('Number of Shipments', 'Number of Containers'):
+        yearly_imports[column] = yearly_imports[column].astype('float')
+        yearly_imports.loc[yearly_imports.index[-1], column] *= modifying_ratio
+        yearly_imports[column] = yearly_imports[column].astype('int')
 
     return yearly_imports
 
 
-def monthly_imports(us_imports_12):
+@traced
+def monthly_imports(us_imports_12, formatted=True):
     """monthly import values to US for the last 12 months
     """
-    us_shipments_12 = us_imports_12.groupby(['month']).size().reset_index(name='Number of Shipments')
-    us_containers_12 = us_imports_12.groupby(['month']).agg({"Number of Containers": np.sum}).reset_index()
+    us_shipments_12 = totals(us_imports_12, ['month'])
+    us_containers_12 = totals(us_imports_12, ['month'], 'Number of Containers')
     monthly_imports = us_shipments_12.merge(us_containers_12, how='left', on='month')
 
-    full_df = pd.DataFrame(np.zeros((13,1)), columns=['month'])
-    full_df['month'] = pd.date_range(end=datetime.now(), periods=13, freq='MS')
-    full_df['month'] = full_df['month'].astype('str')
-    full_df['month'] = full_df['month'].str[:7]
-    monthly_imports = full_df.merge(monthly_imports, how='left', on='month')
     monthly_imports = monthly_imports.fillna(0)
+    # the current month and the 12 before it
+    current_month = month_code(datetime.now())
+    monthly_imports = reindex_periods(monthly_imports, 'month', range(current_month - 12, current_month + 1))
 
-    monthly_imports['month'] = pd.to_datetime(monthly_imports['month']).dt.strftime('%b-%y')
+    month_format = '%b-%y' if formatted else '%Y-%m'
+    monthly_imports['month'] = [month_start(code).strftime(month_format) for code in monthly_imports['month']]
 
     return monthly_imports
 
+@lru_cache(maxsize=None)
+def load_hs_lookup(file=HS_LOOKUP_FILE):
+    """2-digit HS code descriptions, read once per process. Codes are kept as
+    strings so the leading zero of '01' - '09' matches the codes in the data.
+    """
+    return pd.read_csv(file, dtype={'HS Code': 'str'})
+
+def hs_prefixes(hs_codes):
+    """2-digit prefixes of a column of semicolon-separated HS codes, one row per code
+    with the index of the record it came from
+    """
+    # explode, rather than a frame as wide as the record with the most codes
+    codes = hs_codes.dropna().str.split(';').explode()
+    codes = codes.str.strip().str[:2]
+    return codes[codes.str.len() > 0]
+
+def weighted_hs_code_counts(code_lists, counts):
+    """records per 2-digit HS code, sorted, of distinct semicolon-separated code lists
+    each occurring counts times: each list is split once and weighted by its count
+    """
+    codes = hs_prefixes(pd.Series(pd.Index(code_lists).astype('str'), index=np.asarray(counts)))
+    hs_counts = pd.Series(codes.index, index=codes.to_numpy()).groupby(level=0).sum()
+    return hs_counts.sort_values(ascending=False)
+
+@traced
+def hs_code_counts(us_imports):
+    """number of records per 2-digit HS code, splitting the semicolon-separated 'HS Code' column
+    """
+    if not isinstance(us_imports, pd.DataFrame):
+        return us_imports.memo('hs_code_counts', hs_code_counts)
+    hs_codes = us_imports['HS Code']
+    if hasattr(hs_codes, 'cat'):
+        occurrences = hs_codes.value_counts()
+        occurrences = occurrences[occurrences > 0]
+        hs_imports = weighted_hs_code_counts(occurrences.index, occurrences.to_numpy())
+    else:
+        hs_imports = hs_prefixes(hs_codes).value_counts()
+    hs_imports = hs_imports.rename_axis('HS Code').reset_index(name='Number of Containers')
+    return hs_imports
+
+@traced
 def hs_imports_summary_sentence(us_imports):
     """summary setence for hs imports data
     """
-    us_imports['HS Code'] = us_imports['HS Code'].astype('str')
-    hs_imports = us_imports['HS Code'].str.split(';', expand=True).add_prefix('name_')
-    hs_imports = pd.melt(hs_imports,  value_name = 'HS Code')
-    hs_imports['HS Code'] = hs_imports['HS Code'].str.strip().str[:2]
-    hs_imports = hs_imports.groupby(['HS Code']).size().reset_index(name='Number of Containers').sort_values(
-        by=['Number of Containers'], ascending=False)
+    hs_imports = hs_code_counts(us_imports)
 
     number_of_hs_imports = hs_imports.shape[0]
     text1 = str(number_of_hs_imports) + ' 2-digit-HS-goods were recorded in the last 5 years. '
@@ -226,98 +324,106 @@ def hs_imports_summary_sentence(us_imports):
     return text1 + text2
 
 
-def hs_imports(us_imports):
+@traced
+def hs_imports(us_imports, formatted=True):
     """Given us_imports dataframe, return a dataframe with HS Code, its description, # of containers and relative percentage 
     """
-    us_imports['HS Code'] = us_imports['HS Code'].astype('str')
-    hs_imports = us_imports['HS Code'].str.split(';', expand=True).add_prefix('name_')
-    hs_imports = pd.melt(hs_imports,  value_name = 'HS Code')
-    hs_imports['HS Code'] = hs_imports['HS Code'].str.strip().str[:2]
-    hs_imports = hs_imports.groupby(['HS Code']).size().reset_index(name='Number of Containers').sort_values(
-        by=['Number of Containers'], ascending=False)
-
-    hs_lookup = pd.read_csv('hs_lookup.csv', low_memory=False)
-    hs_lookup['HS Code'] = hs_lookup['HS Code'].astype('str')
-    hs_imports = hs_imports.merge(hs_lookup, how='left',on='HS Code')
-    # reorder columns
-    hs_imports = hs_imports[['HS Code', 'HS Code Description', 'Number of Containers']]
-    hs_imports = add_percentage(hs_imports, 
-        'Number of Containers', 'Percentage (historical)')
-    hs_imports = show_sorted_top_n_extra(hs_imports, 'Number of Containers', 5)
+    hs_imports = hs_code_counts(us_imports)
+
+    hs_imports = hs_imports.merge(load_hs_lookup(), how='left',on='HS Code')
+    hs_imports = top_n_table(hs_imports, ['HS Code', 'HS Code Description'], 'Number of Containers', 5,
+                             'Percentage (historical)', formatted=formatted)
 
     return hs_imports
 
-def hs_imports_merge_12(us_imports, us_imports_12):
+@traced
+def hs_imports_merge_12(us_imports, us_imports_12, formatted=True):
     """Add past 12 months data in addition to historical total.
+
+    The past 12 months columns hold the counts of the historical top 5 codes in the
+    past 12 months, 0 for a code without shipments then, with Others and Total rows
+    of the past 12 months total.
     """
-    hs_imports_12 = hs_imports(us_imports_12)
-    hs_imports_merge_12 = hs_imports(us_imports)
-    hs_imports_merge_12 = hs_imports_merge_12.merge(hs_imports_12, how='left', on='HS Code')
-    hs_imports_merge_12 = hs_imports_merge_12[['HS Code', 'HS Code Description_x', 'Number of Containers_x',
-                        'Percentage (historical)_x', 'Number of Containers_y', 'Percentage (historical)_y']]
+    hs_imports_merge_12 = hs_imports(us_imports, formatted)
     hs_imports_merge_12.columns = ['HS Code', 'HS Code Description', 'Number of Containers (historical total)',
-                                    'Percentage (historical)', 'Number of Containers (past 12 months)', 
-                                    'Percentage (past 12 months)']
-
-    for column in hs_imports_merge_12.columns:
-        hs_imports_merge_12[column] = hs_imports_merge_12[column].astype(str)
-
+                                   'Percentage (historical)']
+    counts_12 = hs_code_counts(us_imports_12).set_index('HS Code')['Number of Containers']
+    top_12 = counts_12.reindex(hs_imports_merge_12['HS Code'].iloc[:-2], fill_value=0).to_numpy(dtype='float64')
+    total_12 = float(counts_12.sum())
+    values_12 = np.append(top_12, [total_12 - top_12.sum(), total_12])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shares_12 = values_12 / total_12 * 100
+    if formatted:
+        hs_imports_merge_12['Number of Containers (past 12 months)'] = values_12.astype('int64')
+        hs_imports_merge_12['Percentage (past 12 months)'] = format_percentages(shares_12[:-1]) + ['100%']
+    else:
+        hs_imports_merge_12['Number of Containers (past 12 months)'] = values_12
+        hs_imports_merge_12['Percentage (past 12 months)'] = shares_12
+    if formatted:
+        hs_imports_merge_12 = hs_imports_merge_12.astype(str)
     return hs_imports_merge_12
 
+@traced
+def consignee_totals(us_imports):
+    """number of shipments per consignee, with spelling variants of the same buyer
+    counted together under its most shipped name, see consignees.py
+    """
+    counts = totals(us_imports, ['Consignee'])
+    links = totals(us_imports, ['Consignee', 'Consignee D-U-N-S®'])[['Consignee', 'Consignee D-U-N-S®']]
+    resolved = resolve(counts, links)
+    counts['Consignee'] = counts['Consignee'].astype(str).map(resolved)
+    return group_totals(counts, ['Consignee'], COUNT)
+
+@traced
 def consignees_imports_summary_sentence(us_imports):
     """summary setence for consignees.
     """
-    consignees_imports = us_imports.groupby(['Consignee']).size().reset_index(name='Number of Shipments').sort_values(
-    by=['Number of Shipments'], ascending=False)
+    consignees_imports = consignee_totals(us_imports)
     number_of_consignees = consignees_imports.shape[0]
     text = str(number_of_consignees) + ' US consignees were recorded in the last 5 years. The top customers are:'
     return text
 
 
-def consignees_imports(us_imports):
+@traced
+def consignees_imports(us_imports, formatted=True):
     """ top 10 consignees in number of shipments
     """
-    consignees_imports = us_imports.groupby(['Consignee']).size().reset_index(name='Number of Shipments').sort_values(
-    by=['Number of Shipments'], ascending=False)
-    consignees_imports = add_percentage(consignees_imports, 'Number of Shipments', 'Percentage of Shipments (past 5 years)')
-    consignees_imports = show_sorted_top_n(consignees_imports, 'Number of Shipments', 10)
-
-    for column in consignees_imports.columns:
-        consignees_imports[column] = consignees_imports[column].astype(str)
-    return consignees_imports
+    consignees_imports = top_n_table(consignee_totals(us_imports), ['Consignee'], 'Number of Shipments', 10,
+                                     'Percentage of Shipments (past 5 years)', formatted=formatted)
+    return consignees_imports.astype(str) if formatted else consignees_imports
 
+@traced
 def consignees_imports_12_summary_sentence(us_imports_12):
     """summary sentence for consignees.
     """
-    consignees_imports_12 = us_imports_12.groupby(['Consignee']).size().reset_index(name='Number of Shipments').sort_values(
-    by=['Number of Shipments'], ascending=False)
+    consignees_imports_12 = consignee_totals(us_imports_12)
     number_of_consignees = consignees_imports_12.shape[0]
     text = str(number_of_consignees) + ' US consignees were recorded in the past 12 months. The top customers are:'
     return text
 
 
-def consignees_imports_12(us_imports_12):
+@traced
+def consignees_imports_12(us_imports_12, formatted=True):
     """ top 10 consignees in number of shipments for the past 12 months
     """
-    consignees_imports_12 = us_imports_12.groupby(['Consignee']).size().reset_index(name='Number of Shipments').sort_values(
-    by=['Number of Shipments'], ascending=False)
-    consignees_imports_12 = add_percentage(consignees_imports_12, 'Number of Shipments', 'Percentage of Shipments (past 5 years)')
-    consignees_imports_12 = show_sorted_top_n(consignees_imports_12, 'Number of Shipments', 10)
-
-    for column in consignees_imports_12.columns:
-        consignees_imports_12[column] = consignees_imports_12[column].astype(str)
-
-    return consignees_imports_12
+    consignees_imports_12 = top_n_table(consignee_totals(us_imports_12), ['Consignee'], 'Number of Shipments', 10,
+                                        'Percentage of Shipments (past 5 years)', formatted=formatted)
+    return consignees_imports_12.astype(str) if formatted else consignees_imports_12
 
-def recent_shipments(us_imports):
+@traced
+def recent_shipments(us_imports, formatted=True):
     """ list 10 most recent shipments. 
     """
-    recent_shipments = us_imports[['Arrival Date', 'Shipment Destination', 'Consignee', 'Quantity', 'Weight (kg)', 'Goods Shipped']][:10]
+    # by arrival date, whatever the order of the download; ties keep the file order
+    latest = rows(us_imports).nlargest(10, 'Arrival Date', keep='first')
+    recent_shipments = latest[['Arrival Date', 'Shipment Destination', 'Consignee', 'Quantity', 'Weight (kg)', 'Goods Shipped']].copy()
     # take the only first line of goods shipped description
     recent_shipments['Goods Shipped'] = recent_shipments['Goods Shipped'].str.split(pat="\n").str[:1].str[0].str.capitalize()
+    if not formatted:
+        return recent_shipments.reset_index(drop=True)
 
     recent_shipments['Weight (kg)'] = recent_shipments['Weight (kg)'].astype('int')
-    recent_shipments['Arrival Date'] = recent_shipments['Arrival Date'].str[5:7] + '/' + recent_shipments['Arrival Date'].str[8:10] + '/' + recent_shipments['Arrival Date'].str[:4]
+    recent_shipments['Arrival Date'] = recent_shipments['Arrival Date'].dt.strftime('%m/%d/%Y')
 
     for column in recent_shipments.columns:
         recent_shipments[column] = recent_shipments[column].astype(str)
@@ -1,44 +1,85 @@
-import pandas as pd
-import numpy as np
-from pptx import *
-from pptx.chart.data import ChartData
+import io
+
 from pptx.util import Pt
-from pptx.util import Inches
-from pptx.enum.dml import MSO_THEME_COLOR
 from pptx.dml.color import RGBColor
-import copy
-import geopandas # make world heat map plot
 
-from panjiva import *
+from charts import NUMBER_FORMAT, fill_chart, update_workbook
+from context import report_context
+from template import load_template
+from tables import fill_table
+from slides import REGISTRY, apply, build_slides, compute
+from tracing import stage, traced
 
 class parser:
-    def __init__(self, file, china_exports, us_imports, us_imports_12):
+    def __init__(self, file, china_exports, us_imports, us_imports_12, chart_workbooks=True):
         self.file = file
-        self.prs = Presentation(self.file)
+        # the template is parsed once per process, each report fills in its own copy
+        self.template = load_template(self.file)
+        self.prs = self.template.clone()
         self.slide = None 
         self.china_exports = china_exports
         self.us_imports = us_imports
         self.us_imports_12 = us_imports_12
+        # aggregates shared by all slides of this report
+        self.ctx = report_context(china_exports, us_imports, us_imports_12)
+        # charts whose embedded workbook still holds the template data, see parse_chart
+        self.chart_workbooks = chart_workbooks
+        self.stale_charts = []
+
+    def save(self, target=None):
+        '''write the presentation once all slides are parsed, to a file path or a writable stream.
+        With no target the pptx is returned as bytes.
+        '''
+        if self.chart_workbooks:
+            self.update_workbooks()
+        with stage('save'):
+            if target is None:
+                buffer = io.BytesIO()
+                self.prs.save(buffer)
+                return buffer.getvalue()
+            self.prs.save(target)
+            return target
+
+    def get_slide(self, key):
+        '''slide of the template for a key of template.SLIDES
+        '''
+        return self.prs.slides[self.template.index[key]['slide']]
+
+    def get_shape(self, key, name):
+        '''shape of a slide by its name in the template, e.g. get_shape('yearly_exports', 'Chart 8')
+        '''
+        return self.get_slide(key).shapes[self.template.index[key]['names'][name]]
+
+    def get_charts(self, key):
+        '''charts of a slide, in template order
+        '''
+        shapes = self.get_slide(key).shapes
+        return [shapes[position].chart for position in self.template.index[key]['charts']]
 
     def parse_table(self, df, table):
-        '''parse a pandas dataframe into a powerpoint table
+        '''parse a pandas dataframe into a powerpoint table, see tables.fill_table
         '''
-        # append rows to table
-        for i in range(df.shape[0]-1):
-            new_row = copy.deepcopy(table._tbl.tr_lst[-1])
-            table._tbl.append(new_row)
-
-
-        for i in range(df.shape[0]):
-            for j in range(df.shape[1]):
-                table.cell(i+1,j).text = df.iloc[i,j]
-                if table.cell(i+1, j).text:
-                    font = table.cell(i+1,j).text_frame.paragraphs[0].runs[0].font
-                    font.color.rgb = RGBColor(0, 0, 0)
-                    font.size = Pt(9)
-                    font.name = 'Calibri'
-                    font.bold = False
-        return table
+        with stage('fill_table', rows=len(df)):
+            return fill_table(table, df)
+
+    def parse_chart(self, chart, categories, series, number_format=NUMBER_FORMAT):
+        '''write categories and series [(name, values), ...] into a chart, see charts.fill_chart.
+        Its embedded workbook is rewritten when the report is saved, not at all with
+        chart_workbooks=False.
+        '''
+        with stage('fill_chart', points=len(categories)):
+            if fill_chart(chart, categories, series, number_format):
+                self.stale_charts.append((chart, categories, series, number_format))
+        return chart
+
+    def update_workbooks(self):
+        '''rewrite the embedded workbooks of the charts parsed so far
+        '''
+        with stage('chart workbooks', charts=len(self.stale_charts)):
+            for chart, categories, series, number_format in self.stale_charts:
+                update_workbook(chart, categories, series, number_format)
+        self.stale_charts = []
+        return self
 
     def parse_summary_sentence(self, text_frame, input_text):
         '''parse input_text into desired text_frame
@@ -51,147 +92,97 @@ class parser:
         font.bold = False
         return text_frame
 
-    def parse_slide(self, slide, df, summary_sentence=None):
-        '''Given a template slide, data frame and summary sentence, edit the slide in-place. 
+    def parse_slide(self, key, df, summary_sentence=None):
+        '''Given a slide key, data frame and summary sentence, edit the slide in-place. 
         '''
-        for shape in slide.shapes:
-            if shape.has_table == True:
-                table = shape.table 
-                table = self.parse_table(df, table)
+        slide = self.get_slide(key)
+        entry = self.template.index[key]
+        for position in entry['tables']:
+            table = slide.shapes[position].table
+            table = self.parse_table(df, table)
 
-        for shape in slide.shapes:
-            if not shape.has_text_frame:
-                continue
-            text_frame = shape.text_frame
-            if text_frame.paragraphs[0].text == 'Input summary sentence':
-                text_frame = self.parse_summary_sentence(text_frame, summary_sentence) 
+        if entry['summary'] is not None and summary_sentence is not None:
+            text_frame = slide.shapes[entry['summary']].text_frame
+            text_frame = self.parse_summary_sentence(text_frame, summary_sentence)
+        return slide
 
 
-    def parse_shipment_destinations(self):
-        """parse shipment destinations dataframe into slide
+    def parse(self, key):
+        """compute and render the slide of a key of slides.REGISTRY
         """
-        slide = self.prs.slides[2]
-        df = shipment_destinations(self.china_exports)
-        summary_sentence = exports_summary_sentences(self.china_exports)
-        self.parse_slide(slide, df, summary_sentence)
-
-        countries_df = self.china_exports.groupby(['Shipment Destination']).agg(
-        {"Value of Goods (USD)": np.sum}).reset_index().sort_values(
-        by=['Value of Goods (USD)'], ascending=False)
-
-        # geopandas dataframe
-        world = geopandas.read_file(geopandas.datasets.get_path('naturalearth_lowres'))
-        world = world.merge(countries_df, how='left', left_on='name', right_on='Shipment Destination')
+        return apply(key, self, compute(key, self.ctx))
 
-        # draw geopandas heat world map based on export values
-        plot = world.plot(figsize=(5,3), column='Value of Goods (USD)', cmap='Reds', legend=True)
-        plot.axis('off')
-        fig = plot.get_figure()
-        fig.savefig("output.png")
-
-        shapes = slide.shapes
-        pictures = shapes.add_picture('output.png', Inches(0.57), Inches(2.06))
+    def parse_all(self, keys=None, workers=None, skip=()):
+        """fill in all slides (or those of keys) except those of skip, computing their
+        data concurrently, see slides.build_slides. Skipped slides are left out of the deck.
+        """
+        keys = [key for key in keys or REGISTRY if key not in skip]
+        build_slides(self, keys, workers)
+        self.drop_slides(skip)
+        return self
+
+    def drop_slides(self, keys):
+        """remove the slides of keys from the presentation. Slides are looked up by their
+        template position, so all are looked up before any is removed, and only once
+        the others are filled in.
+        """
+        parts = [self.get_slide(key).part for key in keys]
+        slide_ids = self.prs.slides._sldIdLst
+        for slide_id in list(slide_ids):
+            if self.prs.part.related_part(slide_id.rId) in parts:
+                self.prs.part.drop_rel(slide_id.rId)
+                slide_ids.remove(slide_id)
+        return self
+
+    def drop_slide(self, key):
+        """remove the slide of a key from the presentation, see drop_slides
+        """
+        return self.drop_slides([key])
 
-        self.prs.save('test.pptx')
+    @traced
+    def parse_shipment_destinations(self):
+        """parse shipment destinations dataframe into slide
+        """
+        return self.parse('shipment_destinations')
 
+    @traced
     def parse_yearly_exports(self):
         """parse yearly exports dataframe into slide
         """
-        slide = self.prs.slides[3]
-        df = yearly_exports(self.china_exports)
-        summary_sentence = hs_exports_summary_sentence(self.china_exports)
-        self.parse_slide(slide, df, summary_sentence)
-
-        for shape in slide.shapes:
-            if shape.has_chart == True:
-                chart = shape.chart
-
-                chart_data = ChartData()
-                years = [str(df['year'][i]) for i in range(5)]
-                chart_data.categories = years[0], years[1], years[2], years[3], years[4]
-                chart_data.add_series('Total', tuple(df['Total']), number_format='#,##0')
-                chart_data.add_series('US', tuple(df['US']), number_format='#,##0')
-
-                chart.replace_data(chart_data)
-
-        self.prs.save('test.pptx')
+        return self.parse('yearly_exports')
 
+    @traced
     def parse_hs_exports(self):
         """parse hs exports dataframe into slide
         """
-        slide = self.prs.slides[4]
-        df = hs_exports(self.china_exports)
-        summary_sentence = hs_exports_summary_sentence(self.china_exports)
-        self.parse_slide(slide, df, summary_sentence)
-
-        self.prs.save('test.pptx')
+        return self.parse('hs_exports')
 
+    @traced
     def parse_yearly_imports(self):
         """parse yearly imports into slide
         """
-        slide = self.prs.slides[5]
-        df = yearly_imports(self.us_imports)
-        summary_sentence = yearly_imports_summary_sentence(self.us_imports)
-        self.parse_slide(slide, df, summary_sentence)
-
-        # paste data into graph
-        shape = slide.shapes[-2]
-        chart = shape.chart
-        chart_data = ChartData()
-        years = [str(df['year'][i]) for i in range(6)]
-        chart_data.categories = years[0],years[1],years[2],years[3],years[4],years[5]
-        chart_data.add_series('Number of Shipments', tuple(df['Number of Shipments']), number_format='#,##0')
-        chart_data.add_series('Number of Containers', tuple(df['Number of Containers']), number_format='#,##0')
-        chart.replace_data(chart_data)
-
-        # paste data into graph
-        df = monthly_imports(self.us_imports_12)
-        shape = slide.shapes[-1]
-        chart = shape.chart
-        chart_data = ChartData()
-        months = [str(df['month'][i]) for i in range(13)]
-        chart_data.categories = months[0],months[1],months[2], months[3], months[4],months[5],months[6],months[7],months[8],months[9],months[10],months[11],months[12]
-        chart_data.add_series('Number of Shipments', tuple(df['Number of Shipments']), number_format='#,##0')
-        chart_data.add_series('Number of Containers', tuple(df['Number of Containers']), number_format='#,##0')
-
-        chart.replace_data(chart_data)
-
-        self.prs.save('test.pptx')
+        return self.parse('yearly_imports')
 
+    @traced
     def parse_hs_imports(self):
         """parse hs imports dataframe into slide
         """
-        slide = self.prs.slides[6]
-        df = hs_imports_merge_12(self.us_imports,self.us_imports_12)
-        summary_sentence = hs_imports_summary_sentence(self.us_imports)
-        self.parse_slide(slide, df, summary_sentence)
-        self.prs.save('test.pptx')
+        return self.parse('hs_imports')
 
+    @traced
     def parse_consignees_imports(self):
         """parse consignees imports dataframe into slide
         """
-        slide = self.prs.slides[7]
-        df = consignees_imports(self.us_imports)
-        summary_sentence = consignees_imports_summary_sentence(self.us_imports)
-        self.parse_slide(slide, df, summary_sentence)
-        self.prs.save('test.pptx')
+        return self.parse('consignees_imports')
 
+    @traced
     def parse_consignees_imports_12(self):
         """parse consignees imports dataframe into slide
         """
-        slide = self.prs.slides[8]
-        df = consignees_imports_12(self.us_imports_12)
-        summary_sentence = consignees_imports_12_summary_sentence(self.us_imports)
-        self.parse_slide(slide, df, summary_sentence)
-        self.prs.save('test.pptx') 
+        return self.parse('consignees_imports_12')
 
+    @traced
     def parse_recent_shipments(self):
         """parse recent shipments dataframe into slide
         """
-        slide = self.prs.slides[9]
-        df = recent_shipments(self.us_imports)
-        self.parse_slide(slide, df)
-        self.prs.save('test.pptx')
-
-
-
+        return self.parse('recent_shipments')
@@ -0,0 +1,108 @@
+import argparse
+import os
+import pickle
+
+from atomic import atomic_path
+from batch import safe_name
+from ingest import iter_china_exports, iter_us_imports
+from main import render_report
+from panjiva import get_starting_month
+from streaming import CHUNKSIZE, stream_china_exports, stream_us_imports
+
+STATE_DIR = 'state'
+# bump when the layout of the saved totals changes, older state is then rebuilt
+STATE_VERSION = 3
+
+
+def state_path(company, state_dir=STATE_DIR):
+    return os.path.join(state_dir, safe_name(company) + '.pkl')
+
+def load_state(company, state_dir=STATE_DIR):
+    """saved {'china_exports': partial_totals, 'us_imports': partial_totals} of a company,
+    or None when there is none (or it was saved by an older version)
+    """
+    path = state_path(company, state_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        state = pickle.load(f)
+    if state.get('version') != STATE_VERSION:
+        return None
+    return state
+
+def save_state(company, state, state_dir=STATE_DIR):
+    os.makedirs(state_dir, exist_ok=True)
+    path = state_path(company, state_dir)
+    with atomic_path(path) as tmp_path, open(tmp_path, 'wb') as f:
+        pickle.dump(dict(state, version=STATE_VERSION), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def refresh_totals(totals, chunks):
+    """fold only the rows of the latest saved month and after into totals.
+
+    The latest saved month is read again because the previous download may have
+    ended part way through it. Its saved totals are dropped once the new rows of that
+    month arrive, and kept when the new download starts after it. Panjiva downloads are
+    ordered newest first, so reading stops at the first chunk reaching back before
+    that month: the rest of the file is older still.
+    """
+    start_month = totals.last_month()
+    if start_month is None:
+        for chunk in chunks:
+            totals.add(chunk)
+        return totals
+    reread = False
+    for chunk in chunks:
+        months = chunk['month']
+        new = months.ge(start_month).fillna(False)
+        if new.any():
+            if not reread and months.eq(start_month).any():
+                totals.drop_months([start_month])
+                reread = True
+            totals.add(chunk[new])
+        # a chunk that is not newest first means the file is in another order, read it all
+        if months.lt(start_month).any() and months.dropna().is_monotonic_decreasing:
+            break
+    return totals
+
+def refresh_company(company, china_exports_file, us_imports_file, state_dir=STATE_DIR, chunksize=CHUNKSIZE):
+    """update a company's saved per-month totals with the new months of its downloads.
+
+    The downloads may hold the full history or just the recent months; either way only
+    rows from the last saved month on are added. Without saved state the full history
+    is read once.
+    """
+    state = load_state(company, state_dir)
+    if state is None:
+        state = {'china_exports': stream_china_exports(china_exports_file, chunksize),
+                 'us_imports': stream_us_imports(us_imports_file, chunksize)}
+    else:
+        refresh_totals(state['china_exports'], iter_china_exports(china_exports_file, chunksize))
+        refresh_totals(state['us_imports'], iter_us_imports(us_imports_file, chunksize))
+    save_state(company, state, state_dir)
+    return state
+
+def refresh_report(company, china_exports_file, us_imports_file, output='test.pptx',
+                   template='template.pptx', state_dir=STATE_DIR, chunksize=CHUNKSIZE):
+    """refresh a company's totals and build its report from the merged state
+    """
+    state = refresh_company(company, china_exports_file, us_imports_file, state_dir, chunksize)
+    us_imports = state['us_imports']
+    return render_report(state['china_exports'], us_imports, us_imports.window(get_starting_month()),
+                         output, template)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(
+        description='Add the newest months of a company\'s downloads to its saved totals and rebuild its report.')
+    arg_parser.add_argument('company')
+    arg_parser.add_argument('--china-exports', required=True, help='China Exports csv')
+    arg_parser.add_argument('--us-imports', required=True, help='US Imports csv')
+    arg_parser.add_argument('--output', default=None, help='defaults to <company>.pptx')
+    arg_parser.add_argument('--template', default='template.pptx')
+    arg_parser.add_argument('--state-dir', default=STATE_DIR)
+    arg_parser.add_argument('--chunksize', type=int, default=CHUNKSIZE)
+    args = arg_parser.parse_args()
+
+    refresh_report(args.company, args.china_exports, args.us_imports,
+                   args.output or safe_name(args.company) + '.pptx',
+                   args.template, args.state_dir, args.chunksize)
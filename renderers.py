@@ -0,0 +1,111 @@
+"""Outputs of a report: the pptx deck, or just its numbers.
+
+    render(frames, 'report.pptx', 'pptx', template='template.pptx')
+    render(frames, 'report.json', 'json')
+    render(frames, 'tables', 'csv')
+    render(frames, 'report.xlsx', 'xlsx')
+
+frames is the (china_exports, us_imports, us_imports_12) of context.load_frames.
+The data backends compute every slide's tables and summary sentences with the
+values left as numbers (see context.report_context), skip the world map and never
+import python-pptx, geopandas or matplotlib.
+"""
+import json
+import os
+
+from context import report_context
+from slides import REGISTRY, compute_all
+
+SUMMARIES = 'summaries'
+
+
+class pptx_renderer:
+    """the filled-in template, see main.render_report
+    """
+    def __init__(self, template='template.pptx', workers=None, skip=()):
+        self.template = template
+        self.workers = workers
+        self.skip = skip
+
+    def render(self, frames, output):
+        from main import render_report
+        return render_report(*frames, output=output, template=self.template, workers=self.workers, skip=self.skip)
+
+
+class data_renderer:
+    """tables and summary sentences of every slide as json, csv files or an xlsx workbook
+    """
+    def __init__(self, format='json', workers=None, skip=()):
+        if format not in WRITERS:
+            raise ValueError('unknown format %s, expected one of %s' % (format, ', '.join(WRITERS)))
+        self.format = format
+        self.workers = workers
+        self.skip = skip
+
+    def tables(self, frames):
+        """({table name: DataFrame}, {slide key: summary sentence}) of the report
+        """
+        ctx = report_context(*frames, draw_map=False, formatted=False)
+        keys = [key for key in REGISTRY if key not in self.skip]
+        tables, summaries = {}, {}
+        for key, data in compute_all(ctx, keys, self.workers).items():
+            for name, value in data.items():
+                if name == 'summary':
+                    summaries[key] = value
+                elif hasattr(value, 'columns'):
+                    tables[key if name == 'df' else '%s_%s' % (key, name)] = value
+        return tables, summaries
+
+    def render(self, frames, output):
+        tables, summaries = self.tables(frames)
+        return WRITERS[self.format](tables, summaries, output)
+
+
+def write_json(tables, summaries, output):
+    """one json document: {'tables': {name: [row, ...]}, 'summaries': {key: sentence}}
+    """
+    document = {'tables': {name: json.loads(df.to_json(orient='records', date_format='iso'))
+                           for name, df in tables.items()},
+                'summaries': summaries}
+    with open(output, 'w') as f:
+        json.dump(document, f, indent=1)
+    return output
+
+def write_csv(tables, summaries, output):
+    """a folder with one csv per table and the summary sentences in summaries.json
+    """
+    os.makedirs(output, exist_ok=True)
+    for name, df in tables.items():
+        df.to_csv(os.path.join(output, name + '.csv'), index=False)
+    with open(os.path.join(output, SUMMARIES + '.json'), 'w') as f:
+        json.dump(summaries, f, indent=1)
+    return output
+
+def write_xlsx(tables, summaries, output):
+    """one sheet per table and a summaries sheet; needs openpyxl
+    """
+    import pandas as pd
+
+    with pd.ExcelWriter(output) as writer:
+        for name, df in tables.items():
+            # sheet names are limited to 31 characters
+            df.to_excel(writer, sheet_name=name[:31], index=False)
+        pd.DataFrame({'slide': list(summaries), 'summary': list(summaries.values())}).to_excel(
+            writer, sheet_name=SUMMARIES, index=False)
+    return output
+
+WRITERS = {'json': write_json, 'csv': write_csv, 'xlsx': write_xlsx}
+
+
+def get_renderer(format, **options):
+    """renderer of an output format: pptx, json, csv or xlsx
+    """
+    if format == 'pptx':
+        return pptx_renderer(**options)
+    options.pop('template', None)
+    return data_renderer(format, **options)
+
+def render(frames, output, format='pptx', **options):
+    """write the report of frames to output in format, see get_renderer
+    """
+    return get_renderer(format, **options).render(frames, output)
@@ -0,0 +1,202 @@
+"""Latest shipments and keyword search over goods descriptions, without scanning the csv.
+
+    imports = index_for_file('Panjiva-US_Imports-....csv', 'us_imports')
+    imports.latest(10)
+    imports.search('vacuum flask', 10)
+
+    exports = index_for_file('Panjiva-China_Exports-....csv', 'china_exports')
+    exports.search('tumbler', prefix=True)
+
+A shipment_index keeps the rows of a download ordered by date, latest first, so the
+k latest rows are its first k rows. Each text field has a token_index: the rows
+sharing a description (HS Code Keywords repeats one long list per HS code) are
+indexed once, through token -> distinct values -> rows postings. A search intersects
+the postings of its words and returns the matching rows latest first. Like the
+cubes, indexes are saved next to the ingest cache, keyed by the file's hash.
+"""
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from atomic import atomic_folder
+from ingest import CACHE_DIR, CHINA_EXPORTS_COLUMNS, US_IMPORTS_COLUMNS, file_digest, read_csv
+
+# bump when the columns or the tokenization change, so saved indexes are rebuilt
+INDEX_VERSION = '1'
+
+TOKEN = re.compile(r'[a-z0-9]+')
+
+DATASETS = {
+    'china_exports': {
+        'columns': dict(CHINA_EXPORTS_COLUMNS, **{'HS Code Keywords': 'str'}),
+        'date_column': 'Shipment Month',
+        'fields': ['HS Code Keywords', 'HS Code Description'],
+        'show': ['Shipment Month', 'Shipment Destination', 'Value of Goods (USD)', 'HS Code', 'HS Code Description'],
+    },
+    'us_imports': {
+        'columns': US_IMPORTS_COLUMNS,
+        'date_column': 'Arrival Date',
+        'fields': ['Goods Shipped'],
+        'show': ['Arrival Date', 'Consignee', 'Shipment Destination', 'Quantity', 'Weight (kg)', 'Goods Shipped'],
+    },
+}
+
+
+def tokenize(text):
+    """lowercase words and numbers of a text, e.g. 'DW FLASK 500ML' -> ['dw', 'flask', '500ml']
+    """
+    return TOKEN.findall(str(text).lower())
+
+def ranges(starts, ends):
+    """concatenation of the integer ranges [start, end), without a python loop
+    """
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if not total:
+        return np.zeros(0, dtype='int64')
+    offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return offsets + np.arange(total)
+
+
+class token_index:
+    """Inverted index of one text column: token -> distinct values -> row numbers.
+    """
+    def __init__(self, vocabulary, token_offsets, token_values, value_offsets, value_rows):
+        self.vocabulary = vocabulary
+        self.token_offsets = token_offsets
+        self.token_values = token_values
+        self.value_offsets = value_offsets
+        self.value_rows = value_rows
+
+    @classmethod
+    def build(cls, column):
+        codes, uniques = pd.factorize(column)
+        # the rows of each distinct value, in row order; missing values (code -1) sort first
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        value_rows = np.argsort(codes, kind='stable')[len(codes) - counts.sum():].astype('int32')
+        value_offsets = np.concatenate([[0], np.cumsum(counts)])
+
+        tokens = pd.Series(np.asarray(uniques, dtype=object)).map(tokenize).explode().dropna()
+        pairs = pd.DataFrame({'token': tokens.to_numpy(), 'value': tokens.index.to_numpy()}).drop_duplicates()
+        token_codes, vocabulary = pd.factorize(pairs['token'], sort=True)
+        order = np.lexsort((pairs['value'].to_numpy(), token_codes))
+        token_offsets = np.searchsorted(token_codes[order], np.arange(len(vocabulary) + 1))
+        return cls(np.asarray(vocabulary, dtype=str), token_offsets, pairs['value'].to_numpy()[order].astype('int32'),
+                   value_offsets, value_rows)
+
+    def values(self, word, prefix=False):
+        """sorted ids of the distinct values containing word, or a word starting with it
+        """
+        start = np.searchsorted(self.vocabulary, word)
+        if prefix:
+            end = np.searchsorted(self.vocabulary, word + '\uffff')
+        else:
+            end = start + int(start < len(self.vocabulary) and self.vocabulary[start] == word)
+        values = self.token_values[self.token_offsets[start]:self.token_offsets[end]]
+        return np.unique(values) if prefix else values
+
+    def rows(self, words, prefix=False):
+        """sorted row numbers of the values containing all words
+        """
+        postings = sorted((self.values(word, prefix) for word in words), key=len)
+        values = postings[0]
+        for other in postings[1:]:
+            values = np.intersect1d(values, other, assume_unique=True)
+        positions = ranges(self.value_offsets[values], self.value_offsets[values + 1])
+        return np.sort(self.value_rows[positions])
+
+    def arrays(self):
+        return {'vocabulary': self.vocabulary, 'token_offsets': self.token_offsets, 'token_values': self.token_values,
+                'value_offsets': self.value_offsets, 'value_rows': self.value_rows}
+
+
+class shipment_index:
+    """Rows of a download ordered latest first, with a token_index per text field.
+    """
+    def __init__(self, rows, date_column, fields):
+        self.rows = rows
+        self.date_column = date_column
+        self.fields = fields
+
+    @classmethod
+    def build(cls, df, date_column, text_columns):
+        # stable, so rows of the same date keep the order of the file
+        rows = df.sort_values(date_column, ascending=False, kind='mergesort', na_position='last')
+        rows = rows.reset_index(drop=True)
+        return cls(rows, date_column, {column: token_index.build(rows[column]) for column in text_columns})
+
+    def latest(self, n=10):
+        """the n latest rows
+        """
+        return self.rows.iloc[:n]
+
+    def matches(self, text, fields=None, prefix=False):
+        """sorted row numbers (latest first) with a field containing every word of text
+        """
+        words = tokenize(text)
+        if not words:
+            return np.arange(len(self.rows))
+        found = [self.fields[field].rows(words, prefix) for field in fields or self.fields]
+        return found[0] if len(found) == 1 else np.unique(np.concatenate(found))
+
+    def search(self, text, n=None, fields=None, prefix=False):
+        """the rows with a field containing every word of text, latest first; with
+        prefix, words also match the longer words they start with ('tumbler' -> 'tumblers')
+        """
+        return self.rows.iloc[self.matches(text, fields, prefix)[:n]]
+
+    def save(self, path):
+        """write the index to the folder path, replacing any index saved there
+        """
+        with atomic_folder(path) as tmp_path:
+            self.rows.to_parquet(os.path.join(tmp_path, 'rows.parquet'), index=False)
+            for i, field in enumerate(self.fields.values()):
+                np.savez(os.path.join(tmp_path, 'field-%d.npz' % i), **field.arrays())
+            with open(os.path.join(tmp_path, 'index.json'), 'w') as f:
+                json.dump({'date_column': self.date_column, 'fields': list(self.fields)}, f)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, 'index.json')) as f:
+            meta = json.load(f)
+        fields = {}
+        for i, field in enumerate(meta['fields']):
+            with np.load(os.path.join(path, 'field-%d.npz' % i), allow_pickle=False) as arrays:
+                fields[field] = token_index(**{name: arrays[name] for name in arrays.files})
+        return cls(pd.read_parquet(os.path.join(path, 'rows.parquet')), meta['date_column'], fields)
+
+
+def build_index(path, dataset):
+    """index of a China Exports or US Imports csv, with its text fields read as well
+    """
+    spec = DATASETS[dataset]
+    df = read_csv(path, spec['columns'], spec['date_column'])
+    return shipment_index.build(df, spec['date_column'], spec['fields'])
+
+def index_for_file(path, dataset, cache_dir=CACHE_DIR):
+    """index of a Panjiva csv, saved in cache_dir and keyed by the file's hash, so it is
+    built only the first time a download is searched. Without a Parquet engine the
+    index is built in memory every time.
+    """
+    if not cache_dir:
+        return build_index(path, dataset)
+    key = hashlib.sha1((file_digest(path) + INDEX_VERSION + dataset).encode()).hexdigest()
+    index_path = os.path.join(cache_dir, 'index-' + key)
+    if os.path.isdir(index_path):
+        try:
+            return shipment_index.load(index_path)
+        except ImportError:
+            pass
+
+    index = build_index(path, dataset)
+    os.makedirs(cache_dir, exist_ok=True)
+    try:
+        index.save(index_path)
+    except ImportError:
+        pass
+    return index
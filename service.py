@@ -0,0 +1,236 @@
+"""Local report service that keeps the imports, the template, the HS lookup and the
+world map loaded between reports.
+
+    python3 service.py --port 8765 --workers 2 --queue 8
+
+Jobs are posted to /report either as json with the paths of the csv files
+
+    curl -X POST localhost:8765/report -o report.pptx \
+         -d '{"china_exports": "/data/China_Exports.csv", "us_imports": "/data/US_Imports.csv"}'
+
+or as a multipart upload of both files
+
+    curl -X POST localhost:8765/report -o report.pptx \
+         -F china_exports=@China_Exports.csv -F us_imports=@US_Imports.csv
+
+and answered with the pptx. At most `workers` reports are built at a time and at
+most `queue` more wait; further jobs get 503 with a Retry-After header. GET /health
+reports the queue state.
+"""
+import argparse
+import json
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import traceback
+from email.parser import BytesParser
+from email.policy import default as default_policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PPTX_TYPE = 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
+MAX_UPLOAD_BYTES = 1 << 30
+# seconds a client is told to wait when the queue is full
+RETRY_AFTER = 5
+
+
+class job:
+    """one report request, waited on by the http thread that received it
+    """
+    def __init__(self, china_exports_file, us_imports_file, chunksize=None):
+        self.china_exports_file = china_exports_file
+        self.us_imports_file = us_imports_file
+        self.chunksize = chunksize
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.seconds = None
+
+
+class report_service:
+    """a bounded queue of jobs and the worker threads building their reports
+    """
+    def __init__(self, template='template.pptx', workers=2, queue_size=8, chunksize=None):
+        self.template = os.path.abspath(template)
+        self.chunksize = chunksize
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.active = 0
+        self.completed = 0
+        self.lock = threading.Lock()
+        self.threads = [threading.Thread(target=self.work, daemon=True) for _ in range(workers)]
+
+    def warm(self):
+        """import the report dependencies and load everything shared between reports
+        """
+        from main import build_report
+        from template import load_template
+        from panjiva import load_hs_lookup
+        from heatmap import get_base_map
+        load_template(self.template)
+        load_hs_lookup()
+        get_base_map()
+        self.build_report = build_report
+
+    def start(self):
+        self.warm()
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def submit(self, job):
+        """queue a job, raising queue.Full when the service is at capacity
+        """
+        self.jobs.put_nowait(job)
+        return job
+
+    def work(self):
+        while True:
+            job = self.jobs.get()
+            with self.lock:
+                self.active += 1
+            start = time.perf_counter()
+            try:
+                job.result = self.build_report(job.china_exports_file, job.us_imports_file, None,
+                                               self.template, job.chunksize or self.chunksize)
+            except Exception:
+                job.error = traceback.format_exc()
+            job.seconds = time.perf_counter() - start
+            with self.lock:
+                self.active -= 1
+                self.completed += 1
+            job.done.set()
+            self.jobs.task_done()
+
+    def status(self):
+        with self.lock:
+            return {'workers': len(self.threads), 'active': self.active, 'queued': self.jobs.qsize(),
+                    'queue_size': self.jobs.maxsize, 'completed': self.completed}
+
+
+def read_uploads(content_type, body):
+    """{field name: file bytes} of a multipart/form-data body
+    """
+    header = ('Content-Type: %s\r\nMIME-Version: 1.0\r\n\r\n' % content_type).encode()
+    message = BytesParser(policy=default_policy).parsebytes(header + body)
+    if not message.is_multipart():
+        raise ValueError('expected a multipart/form-data body')
+    uploads = {}
+    for part in message.iter_parts():
+        name = part.get_param('name', header='content-disposition')
+        if name:
+            uploads[name] = part.get_payload(decode=True)
+    return uploads
+
+
+class request_handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def send_body(self, code, body, content_type='application/json', headers=()):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode()
+        elif isinstance(body, str):
+            body = body.encode()
+            content_type = 'text/plain; charset=utf-8'
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/health':
+            return self.send_body(200, self.server.service.status())
+        self.send_body(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/report':
+            return self.send_body(404, {'error': 'not found'})
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_UPLOAD_BYTES:
+            return self.send_body(413, {'error': 'upload larger than %d bytes' % MAX_UPLOAD_BYTES})
+        body = self.rfile.read(length)
+
+        upload_dir = None
+        try:
+            content_type = self.headers.get('Content-Type', 'application/json')
+            if content_type.startswith('multipart/form-data'):
+                uploads = read_uploads(content_type, body)
+                upload_dir = tempfile.mkdtemp(prefix='panjiva-')
+                files, chunksize = {}, None
+                for name in ('china_exports', 'us_imports'):
+                    if name not in uploads:
+                        raise ValueError('missing upload ' + name)
+                    files[name] = os.path.join(upload_dir, name + '.csv')
+                    with open(files[name], 'wb') as f:
+                        f.write(uploads[name])
+            else:
+                request = json.loads(body or b'{}')
+                if not isinstance(request, dict):
+                    raise ValueError('expected a json object')
+                files = {name: request.get(name) for name in ('china_exports', 'us_imports')}
+                chunksize = request.get('chunksize')
+                if chunksize is not None and (type(chunksize) is not int or chunksize < 1):
+                    raise ValueError('chunksize must be a positive integer, not %s' % json.dumps(chunksize))
+                for name, path in files.items():
+                    if not path or not os.path.isfile(path):
+                        raise ValueError('%s file not found: %s' % (name, path))
+        except ValueError as e:
+            self.cleanup(upload_dir)
+            return self.send_body(400, {'error': str(e)})
+
+        try:
+            submitted = self.server.service.submit(job(files['china_exports'], files['us_imports'], chunksize))
+        except queue.Full:
+            self.cleanup(upload_dir)
+            return self.send_body(503, {'error': 'queue full'}, headers=[('Retry-After', str(RETRY_AFTER))])
+
+        submitted.done.wait()
+        self.cleanup(upload_dir)
+        if submitted.error:
+            return self.send_body(500, submitted.error)
+        self.send_body(200, submitted.result, PPTX_TYPE,
+                       headers=[('Content-Disposition', 'attachment; filename="report.pptx"'),
+                                ('X-Report-Seconds', '%.3f' % submitted.seconds)])
+
+    @staticmethod
+    def cleanup(upload_dir):
+        if upload_dir:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+
+
+def make_server(service, host='127.0.0.1', port=8765):
+    """http server answering with a started report_service; port 0 picks a free port
+    """
+    server = ThreadingHTTPServer((host, port), request_handler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+def serve(host='127.0.0.1', port=8765, template='template.pptx', workers=2, queue_size=8, chunksize=None):
+    service = report_service(template, workers, queue_size, chunksize).start()
+    server = make_server(service, host, port)
+    print('serving reports on http://%s:%d/report' % (host, port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description='Serve reports from a process that stays loaded.')
+    arg_parser.add_argument('--host', default='127.0.0.1')
+    arg_parser.add_argument('--port', type=int, default=8765)
+    arg_parser.add_argument('--template', default='template.pptx')
+    arg_parser.add_argument('--workers', type=int, default=2, help='reports built at the same time')
+    arg_parser.add_argument('--queue', type=int, default=8, help='jobs waiting beyond the workers')
+    arg_parser.add_argument('--chunksize', type=int, default=None,
+                            help='stream the csv files this many rows at a time')
+    args = arg_parser.parse_args()
+
+    serve(args.host, args.port, args.template, args.workers, args.queue, args.chunksize)
@@ -0,0 +1,163 @@
+"""The slides of the report, each as a data function and a render function.
+
+A data function takes the report_context and returns everything its slide shows
+(tables, sentences, chart series, the heat map png), as slide text or as plain
+numbers depending on ctx.formatted. It only reads the shared frames, so the data
+functions of different slides can run at the same time. A render function writes
+that data into the presentation of a parser and must run on one thread at a time,
+in slide order.
+
+    REGISTRY['yearly_exports'].data(ctx) -> {'df': ..., 'summary': ...}
+    REGISTRY['yearly_exports'].render(report, data)
+"""
+import os
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from panjiva import (
+    consignees_imports, consignees_imports_12, consignees_imports_12_summary_sentence,
+    consignees_imports_summary_sentence, exports_summary_sentences, hs_exports, hs_exports_summary_sentence,
+    hs_imports_merge_12, hs_imports_summary_sentence, monthly_imports, recent_shipments,
+    shipment_destinations, totals, yearly_exports, yearly_imports, yearly_imports_summary_sentence,
+)
+from heatmap import render_heat_map
+from tracing import stage
+
+# python-pptx is imported by the render functions, so computing slide data does not load it
+
+slide_spec = namedtuple('slide_spec', ['data', 'render'])
+
+REGISTRY = OrderedDict()
+# the slide with the world map, the only one needing geopandas and matplotlib
+MAP_SLIDE = 'shipment_destinations'
+
+
+def register(key, data, render):
+    """add (or replace) the data and render functions of the template slide `key`
+    """
+    REGISTRY[key] = slide_spec(data, render)
+
+
+def shipment_destinations_data(ctx):
+    image = None
+    if ctx.draw_map:
+        countries_df = totals(ctx.china_exports, ['Shipment Destination'], 'Value of Goods (USD)')
+        # the map is drawn here rather than when rendering so it overlaps with the other slides
+        with stage('render_heat_map'):
+            image = render_heat_map(countries_df.set_index('Shipment Destination')['Value of Goods (USD)'])
+    return {'df': shipment_destinations(ctx.china_exports, ctx.formatted),
+            'summary': exports_summary_sentences(ctx.china_exports),
+            'map': image}
+
+def shipment_destinations_render(report, data):
+    from pptx.util import Inches
+
+    slide = report.parse_slide('shipment_destinations', data['df'], data['summary'])
+    # draw heat world map based on export values, passed to the slide in memory
+    if data['map'] is not None:
+        slide.shapes.add_picture(data['map'], Inches(0.57), Inches(2.06))
+
+def yearly_exports_data(ctx):
+    return {'df': yearly_exports(ctx.china_exports, ctx.formatted),
+            'summary': hs_exports_summary_sentence(ctx.china_exports)}
+
+def yearly_exports_render(report, data):
+    df = data['df']
+    report.parse_slide('yearly_exports', df, data['summary'])
+    series = [('Total', df['Total'].tolist()), ('US', df['US'].tolist())]
+    for chart in report.get_charts('yearly_exports'):
+        report.parse_chart(chart, df['year'].tolist(), series)
+
+def hs_exports_data(ctx):
+    return {'df': hs_exports(ctx.china_exports, ctx.formatted),
+            'summary': hs_exports_summary_sentence(ctx.china_exports)}
+
+def yearly_imports_data(ctx):
+    return {'df': yearly_imports(ctx.us_imports, ctx.formatted),
+            'summary': yearly_imports_summary_sentence(ctx.us_imports),
+            'monthly': monthly_imports(ctx.us_imports_12, ctx.formatted)}
+
+def yearly_imports_render(report, data):
+    df = data['df']
+    report.parse_slide('yearly_imports', df, data['summary'])
+
+    yearly_chart, monthly_chart = report.get_charts('yearly_imports')
+    # paste data into graphs
+    for chart, df, period in ((yearly_chart, df, 'year'), (monthly_chart, data['monthly'], 'month')):
+        report.parse_chart(chart, df[period].tolist(), [('Number of Shipments', df['Number of Shipments'].tolist()),
+                                                        ('Number of Containers', df['Number of Containers'].tolist())])
+
+def hs_imports_data(ctx):
+    return {'df': hs_imports_merge_12(ctx.us_imports, ctx.us_imports_12, ctx.formatted),
+            'summary': hs_imports_summary_sentence(ctx.us_imports)}
+
+def consignees_imports_data(ctx):
+    return {'df': consignees_imports(ctx.us_imports, ctx.formatted),
+            'summary': consignees_imports_summary_sentence(ctx.us_imports)}
+
+def consignees_imports_12_data(ctx):
+    return {'df': consignees_imports_12(ctx.us_imports_12, ctx.formatted),
+            'summary': consignees_imports_12_summary_sentence(ctx.us_imports_12)}
+
+def recent_shipments_data(ctx):
+    return {'df': recent_shipments(ctx.us_imports, ctx.formatted)}
+
+def table_render(key):
+    """render function of a slide showing just a table and a summary sentence
+    """
+    def render(report, data):
+        report.parse_slide(key, data['df'], data.get('summary'))
+    return render
+
+
+register('shipment_destinations', shipment_destinations_data, shipment_destinations_render)
+register('yearly_exports', yearly_exports_data, yearly_exports_render)
+register('hs_exports', hs_exports_data, table_render('hs_exports'))
+register('yearly_imports', yearly_imports_data, yearly_imports_render)
+register('hs_imports', hs_imports_data, table_render('hs_imports'))
+register('consignees_imports', consignees_imports_data, table_render('consignees_imports'))
+register('consignees_imports_12', consignees_imports_12_data, table_render('consignees_imports_12'))
+register('recent_shipments', recent_shipments_data, table_render('recent_shipments'))
+
+
+def compute(key, ctx):
+    with stage(key + ' data'):
+        return REGISTRY[key].data(ctx)
+
+def apply(key, report, data):
+    with stage(key + ' render'):
+        return REGISTRY[key].render(report, data)
+
+def compute_all(ctx, keys=None, workers=None):
+    """{key: data} of the slides of keys (default: all), computed on `workers` threads
+    """
+    keys = list(keys or REGISTRY)
+    workers = workers or min(len(keys), os.cpu_count() or 1)
+    if workers <= 1:
+        return OrderedDict((key, compute(key, ctx)) for key in keys)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [(key, pool.submit(compute, key, ctx)) for key in keys]
+        return OrderedDict((key, future.result()) for key, future in futures)
+
+def build_slides(report, keys=None, workers=None):
+    """fill in the slides of keys (default: all, in registry order) of a parser.
+
+    The data functions run on a pool of `workers` threads (default one per slide,
+    up to the number of cores) while the renders are applied on this thread in
+    order, each as soon as its data is ready. workers=1 runs everything in turn.
+    Threads rather than processes because the data functions share the frames and
+    aggregates of report.ctx; pandas releases the GIL in much of its groupby and
+    sorting work, and the map is drawn while the other slides compute.
+    """
+    keys = list(keys or REGISTRY)
+    workers = workers or min(len(keys), os.cpu_count() or 1)
+    if workers <= 1:
+        for key in keys:
+            apply(key, report, compute(key, report.ctx))
+        return report
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [(key, pool.submit(compute, key, report.ctx)) for key in keys]
+        for key, future in futures:
+            apply(key, report, future.result())
+    return report
@@ -0,0 +1,154 @@
+import copy
+
+import pandas as pd
+
+from panjiva import COUNT, REPORT_TOTALS, group_totals, hs_prefixes
+from ingest import iter_china_exports, iter_us_imports
+
+# rows kept for recent_shipments
+RECENT_ROWS = 10
+CHUNKSIZE = 100000
+
+
+def month_keys(keys):
+    """group keys of a stored total, always including the month so totals can be windowed
+    """
+    return ['month'] + [key for key in keys if key != 'month']
+
+def combine(left, right, keys, column):
+    """add up two partial totals of the same keys
+    """
+    if left is None:
+        return right
+    return group_totals(pd.concat([left, right], ignore_index=True), keys, column)
+
+
+class partial_totals:
+    """Per-month group totals of a shipment csv, built one chunk at a time.
+
+    Memory is bounded by the number of distinct groups, not by the number of rows.
+    Two partial_totals of the same specs can be merged, e.g. when chunks are folded
+    on different workers. The functions in panjiva.py accept a partial_totals
+    wherever they take a DataFrame, like a context.cached_frame.
+    """
+    def __init__(self, specs, date_column, recent_rows=0, hs_codes=False):
+        self.specs = [(tuple(keys), measure) for keys, measure in specs]
+        self.date_column = date_column
+        self.recent_rows = recent_rows
+        self.hs_codes = hs_codes
+        self.tables = {}
+        self.hs_counts = None
+        self.recent = None
+        self.start_month = None
+
+    def add(self, chunk):
+        """fold a chunk of rows into the totals
+        """
+        for keys, measure in self.specs:
+            stored_keys = month_keys(keys)
+            partial = group_totals(chunk, stored_keys, measure)
+            self.tables[(keys, measure)] = combine(
+                self.tables.get((keys, measure)), partial, stored_keys, measure or COUNT)
+
+        if self.hs_codes:
+            codes = hs_prefixes(chunk['HS Code'])
+            codes = pd.DataFrame({'month': chunk['month'].loc[codes.index].to_numpy(),
+                                  'HS Code': codes.to_numpy()})
+            partial = group_totals(codes, ['month', 'HS Code']).rename(
+                columns={COUNT: 'Number of Containers'})
+            self.hs_counts = combine(self.hs_counts, partial, ['month', 'HS Code'], 'Number of Containers')
+
+        if self.recent_rows:
+            self.add_recent(chunk)
+        return self
+
+    def add_recent(self, rows):
+        """keep the recent_rows latest rows, earlier rows first among equal dates
+        """
+        if self.recent is not None:
+            rows = pd.concat([self.recent, rows], ignore_index=True)
+        self.recent = rows.nlargest(self.recent_rows, self.date_column, keep='first').reset_index(drop=True)
+
+    def merge(self, other):
+        """add the totals of another partial_totals of the same specs
+        """
+        for spec, table in other.tables.items():
+            keys, measure = spec
+            self.tables[spec] = combine(self.tables.get(spec), table, month_keys(keys), measure or COUNT)
+        if other.hs_counts is not None:
+            self.hs_counts = combine(self.hs_counts, other.hs_counts, ['month', 'HS Code'], 'Number of Containers')
+        if self.recent_rows and other.recent is not None:
+            self.add_recent(other.recent)
+        return self
+
+    def last_month(self):
+        """period code of the latest month with any totals, or None when empty
+        """
+        months = [table['month'].max() for table in self.tables.values() if len(table)]
+        return max(months) if months else None
+
+    def drop_months(self, months):
+        """forget the totals of the given months (period codes), so they can be read again
+        """
+        months = list(months)
+        for spec, table in self.tables.items():
+            self.tables[spec] = table[~table['month'].isin(months)]
+        if self.hs_counts is not None:
+            self.hs_counts = self.hs_counts[~self.hs_counts['month'].isin(months)]
+        if self.recent is not None:
+            self.recent = self.recent[~self.recent['month'].isin(months)].reset_index(drop=True)
+        return self
+
+    def window(self, start_month):
+        """a view of the totals of months from start_month (a period code) on
+        """
+        view = copy.copy(self)
+        view.start_month = start_month
+        return view
+
+    def _windowed(self, table):
+        if self.start_month is None:
+            return table
+        return table[table['month'] >= self.start_month]
+
+    def totals(self, keys, measure=None):
+        """sum of measure (or number of rows when measure is None) per group of keys
+        """
+        spec = (tuple(keys), measure)
+        if spec not in self.tables:
+            raise KeyError('total of %s by %s was not collected, see panjiva.REPORT_TOTALS'
+                           % (measure or COUNT, list(keys)))
+        column = measure or COUNT
+        return group_totals(self._windowed(self.tables[spec]), list(keys), column)
+
+    def memo(self, name, func):
+        """results of the derived computations panjiva.py caches on a frame
+        """
+        if name == 'hs_code_counts' and self.hs_counts is not None:
+            hs_counts = group_totals(self._windowed(self.hs_counts), ['HS Code'], 'Number of Containers')
+            return hs_counts.sort_values(by=['Number of Containers'], ascending=False)
+        raise KeyError(name + ' was not collected while streaming')
+
+    @property
+    def df(self):
+        """the latest rows, for recent_shipments
+        """
+        return self.recent
+
+
+def stream_china_exports(path, chunksize=CHUNKSIZE):
+    """partial_totals of a China Exports csv read chunksize rows at a time
+    """
+    totals = partial_totals(REPORT_TOTALS['china_exports'], 'Shipment Month')
+    for chunk in iter_china_exports(path, chunksize):
+        totals.add(chunk)
+    return totals
+
+def stream_us_imports(path, chunksize=CHUNKSIZE):
+    """partial_totals of a US Imports csv read chunksize rows at a time
+    """
+    totals = partial_totals(REPORT_TOTALS['us_imports'], 'Arrival Date',
+                            recent_rows=RECENT_ROWS, hs_codes=True)
+    for chunk in iter_us_imports(path, chunksize):
+        totals.add(chunk)
+    return totals
@@ -0,0 +1,107 @@
+import copy
+import re
+
+from lxml import etree
+from pptx.oxml.ns import qn
+
+# characters lxml refuses to write into xml text
+ILLEGAL_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# labels of the rows added by show_sorted_top_n(_extra), merged across repeated cells
+MERGE_VALUES = ('Others', 'Total')
+
+
+def make_run(font='Calibri', size=9, color='000000', bold=False):
+    """an <a:r> element with the given formatting, copied for every cell
+    """
+    run = etree.Element(qn('a:r'))
+    rpr = etree.SubElement(run, qn('a:rPr'), lang='en-US', sz=str(int(size * 100)),
+                           b='1' if bold else '0', dirty='0')
+    fill = etree.SubElement(rpr, qn('a:solidFill'))
+    etree.SubElement(fill, qn('a:srgbClr'), val=color)
+    etree.SubElement(rpr, qn('a:latin'), typeface=font)
+    etree.SubElement(run, qn('a:t'))
+    return run
+
+def set_cell_text(tc, text, run, align=None):
+    """replace the text of an <a:tc> with one formatted run per line,
+    keeping the paragraph properties (alignment, spacing) of the template cell
+    """
+    txBody = tc.find(qn('a:txBody'))
+    paragraphs = txBody.findall(qn('a:p'))
+    p = paragraphs[0]
+    for extra in paragraphs[1:]:
+        txBody.remove(extra)
+    for child in p.findall(qn('a:r')) + p.findall(qn('a:br')) + p.findall(qn('a:fld')):
+        p.remove(child)
+
+    if align is not None:
+        pPr = p.find(qn('a:pPr'))
+        if pPr is None:
+            pPr = etree.Element(qn('a:pPr'))
+            p.insert(0, pPr)
+        pPr.set('algn', align)
+
+    if not text:
+        return
+    lines = ILLEGAL_XML_CHARS.sub('', text).split('\n')
+    for i, line in enumerate(lines):
+        if i > 0:
+            p = copy.deepcopy(p)
+            for child in p.findall(qn('a:r')):
+                p.remove(child)
+            txBody.append(p)
+        new_run = copy.deepcopy(run)
+        new_run.find(qn('a:t')).text = line
+        end = p.find(qn('a:endParaRPr'))
+        if end is None:
+            p.append(new_run)
+        else:
+            end.addprevious(new_run)
+
+def merge_cells(tcs, values, merge_values=MERGE_VALUES):
+    """horizontally merge runs of equal adjacent cells whose value is in merge_values,
+    e.g. the 'Others' | 'Others' cells of the HS code tables
+    """
+    j = 0
+    while j < len(values):
+        span = 1
+        while (values[j] in merge_values and j + span < len(values)
+               and values[j + span] == values[j]):
+            span += 1
+        if span > 1:
+            tcs[j].set('gridSpan', str(span))
+            for k in range(j + 1, j + span):
+                tcs[k].set('hMerge', '1')
+        j += span
+    return [j for j, tc in enumerate(tcs) if tc.get('hMerge') == '1']
+
+def fill_table(table, df, first_row=1, align=None, merge_values=MERGE_VALUES, **font):
+    """write a DataFrame of strings into a python-pptx table in a single pass over the xml.
+
+    Rows from first_row on are replaced by one row per record of df, each a copy of the
+    template's last row so borders, fills and paragraph alignment are kept. align maps
+    column positions to 'l', 'ctr' or 'r'; font takes the arguments of make_run.
+    """
+    tbl = table._tbl
+    rows = tbl.tr_lst
+    prototype = rows[-1]
+    for tr in rows[first_row:]:
+        tbl.remove(tr)
+    # new rows go right after the kept ones, ahead of any <a:extLst>
+    previous = rows[first_row - 1] if first_row else tbl.find(qn('a:tblGrid'))
+
+    run = make_run(**font)
+    align = align or {}
+    for values in df.itertuples(index=False, name=None):
+        values = ['' if value is None else str(value) for value in values]
+        tr = copy.deepcopy(prototype)
+        tcs = tr.findall(qn('a:tc'))
+        merged = merge_cells(tcs, values, merge_values) if merge_values else []
+        for j, (tc, value) in enumerate(zip(tcs, values)):
+            # merged labels span columns of mixed alignment, so they are centered
+            cell_align = 'ctr' if tc.get('gridSpan') else align.get(j)
+            set_cell_text(tc, '' if j in merged else value, run, cell_align)
+        previous.addnext(tr)
+        previous = tr
+    return table
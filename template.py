@@ -0,0 +1,72 @@
+import copy
+import io
+import os
+
+# slide of the template filled in by each parse_* step of the parser
+SLIDES = {
+    'shipment_destinations': 2,
+    'yearly_exports': 3,
+    'hs_exports': 4,
+    'yearly_imports': 5,
+    'hs_imports': 6,
+    'consignees_imports': 7,
+    'consignees_imports_12': 8,
+    'recent_shipments': 9,
+}
+
+# text of the placeholder replaced by a slide's summary sentence
+SUMMARY_PLACEHOLDER = 'Input summary sentence'
+
+
+def build_index(prs):
+    """positions of the shapes of every slide in SLIDES, e.g.
+
+    {'yearly_imports': {'slide': 5, 'tables': [], 'charts': [7, 8], 'summary': 6,
+                        'names': {'Chart 10': 7, ...}}, ...}
+    """
+    index = {}
+    for key, slide_number in SLIDES.items():
+        entry = {'slide': slide_number, 'tables': [], 'charts': [], 'summary': None, 'names': {}}
+        for position, shape in enumerate(prs.slides[slide_number].shapes):
+            entry['names'][shape.name] = position
+            if shape.has_table:
+                entry['tables'].append(position)
+            if shape.has_chart:
+                entry['charts'].append(position)
+            if shape.has_text_frame and shape.text_frame.paragraphs[0].text == SUMMARY_PLACEHOLDER:
+                entry['summary'] = position
+        index[key] = entry
+    return index
+
+
+class template:
+    """template.pptx parsed once and cloned for every report.
+
+    The master presentation is never read from directly: python-pptx caches proxy
+    objects that point into the xml of a part, and a deep copy of those would be
+    detached from the copied slides. Clones are made from the untouched master.
+    """
+    def __init__(self, file):
+        # imported here so listing SLIDES does not load python-pptx
+        from pptx import Presentation
+
+        with open(file, 'rb') as f:
+            blob = f.read()
+        self._master = Presentation(io.BytesIO(blob))
+        self.index = build_index(Presentation(io.BytesIO(blob)))
+
+    def clone(self):
+        """a fresh, independent copy of the template presentation
+        """
+        return copy.deepcopy(self._master)
+
+
+_templates = {}
+
+def load_template(file):
+    """parsed template for a file path, cached for the lifetime of the process
+    """
+    key = (os.path.abspath(file), os.path.getmtime(file))
+    if key not in _templates:
+        _templates[key] = template(file)
+    return _templates[key]
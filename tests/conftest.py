@@ -0,0 +1,37 @@
+import glob
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the modules of the report live at the top of the repository
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture
+def china_exports_file():
+    """the China Exports download bundled with the repository
+    """
+    return glob.glob(os.path.join(ROOT, 'Panjiva-China_Exports-*.csv'))[0]
+
+@pytest.fixture
+def us_imports_file():
+    """the US Imports download bundled with the repository
+    """
+    return glob.glob(os.path.join(ROOT, 'Panjiva-US_Imports-*.csv'))[0]
+
+@pytest.fixture
+def split_download(tmp_path, us_imports_file):
+    """write the rows of the bundled US Imports download whose arrival date meets a
+    condition to a csv of their own, e.g. split_download('old.csv', lambda dates: dates < '2019-05')
+    """
+    import pandas as pd
+
+    df = pd.read_csv(us_imports_file, dtype=str, keep_default_na=False)
+
+    def split(name, condition):
+        path = str(tmp_path / name)
+        df[condition(df['Arrival Date'])].to_csv(path, index=False)
+        return path
+    return split
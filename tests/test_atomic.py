@@ -0,0 +1,26 @@
+import os
+
+import pytest
+
+from atomic import atomic_folder, atomic_path
+
+
+def test_atomic_path_keeps_old_file_when_writing_fails(tmp_path):
+    path = str(tmp_path / 'cache.csv')
+    with atomic_path(path) as write_path, open(write_path, 'w') as f:
+        f.write('old')
+    with pytest.raises(ImportError):
+        with atomic_path(path) as write_path, open(write_path, 'w') as f:
+            f.write('half')
+            raise ImportError('no parquet engine')
+    assert open(path).read() == 'old'
+    assert os.listdir(str(tmp_path)) == ['cache.csv']
+
+
+def test_atomic_folder_replaces_folder(tmp_path):
+    path = str(tmp_path / 'cube')
+    for name in ('old.json', 'new.json'):
+        with atomic_folder(path) as write_path:
+            open(os.path.join(write_path, name), 'w').close()
+    assert os.listdir(path) == ['new.json']
+    assert os.listdir(str(tmp_path)) == ['cube']
@@ -0,0 +1,22 @@
+import os
+import time
+
+import batch
+
+
+def crashing_job(job, output_dir, template, chunksize=None):
+    if job[0] == 'crash':
+        # a worker killed by the system, as out of memory
+        os._exit(1)
+    # still running, or queued, when the worker crashes
+    time.sleep(0.2)
+    return {'company': job[0], 'output': job[0] + '.pptx', 'seconds': 0, 'error': None}
+
+
+def test_crashed_worker_only_fails_its_job(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch, 'run_job', crashing_job)
+    jobs = [(company, 'exports.csv', 'imports.csv') for company in ('a', 'crash', 'b', 'c', 'd', 'e')]
+    results = {result['company']: result for result in batch.run_batch(jobs, str(tmp_path), workers=2)}
+    assert sorted(results) == ['a', 'b', 'c', 'crash', 'd', 'e']
+    assert results['crash']['error'] and results['crash']['output'] is None
+    assert all(results[company]['error'] is None for company in 'abcde')
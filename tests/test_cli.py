@@ -0,0 +1,23 @@
+import argparse
+import os
+import shutil
+
+import cli
+
+
+def test_named_files_are_not_searched_for(tmp_path, monkeypatch, china_exports_file, us_imports_file):
+    # a download of two pages in the directory, which would be merged into the cache
+    pages = tmp_path / 'downloads'
+    pages.mkdir()
+    for name in ('1_to_1000', '1001_to_1832'):
+        shutil.copy(us_imports_file, str(pages / ('Panjiva-US_Imports-everich-results_%s_of_1832.csv' % name)))
+    monkeypatch.chdir(tmp_path)
+
+    args = argparse.Namespace(directory=str(pages), china_exports=[china_exports_file], us_imports=[us_imports_file])
+    assert cli.input_files(args) == (china_exports_file, us_imports_file)
+    assert not os.path.exists('.panjiva_cache')
+
+    args.us_imports = None
+    china_exports, us_imports = cli.input_files(args)
+    assert china_exports == china_exports_file
+    assert os.path.dirname(os.path.abspath(us_imports)) == str(tmp_path / '.panjiva_cache')
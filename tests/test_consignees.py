@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import consignee_names
+from consignees import cluster_names, normalize_name, resolve
+
+
+def clustered(names, duns=None):
+    labels = cluster_names(names, duns)
+    return [names[label] for label in labels]
+
+def test_spelling_variants_are_merged():
+    names = ['Base Brands Llc', 'BASE BRANDS LLC', 'Base Brands, Inc.', 'Base Brands Llc 100 Main Street',
+             'Base Brandss Llc']
+    assert clustered(names) == ['Base Brands Llc'] * len(names)
+
+@pytest.mark.parametrize('names', [
+    ['Buyer 123 Llc', 'Buyer 124 Inc'],
+    ['Store 12', 'Store 13'],
+    ['Acme Usa', 'Acme Corp'],
+])
+def test_distinct_buyers_stay_separate(names):
+    assert clustered(names) == names
+
+def test_similar_names_do_not_chain():
+    # each name is one letter away from the previous one, but the last is far from the first
+    names = ['abcdefgh', 'abcdefgx', 'abcdefyx', 'abcdezyx', 'abcdwzyx']
+    labels = clustered(names)
+    assert labels[0] == labels[1] == 'abcdefgh'
+    assert labels[-1] != 'abcdefgh'
+
+def test_duns_links_merge_different_spellings():
+    names = ['Takeya Usa Corp', 'Asobu Holdings']
+    assert clustered(names, [(0, '123456789'), (1, '123456789')]) == ['Takeya Usa Corp'] * 2
+
+def test_usa_is_not_a_suffix():
+    assert normalize_name('Takeya Usa, Corp.') == 'takeya usa'
+
+def test_synthetic_buyers_resolve_to_themselves():
+    import numpy as np
+
+    names, duns = consignee_names(3000, np.random.default_rng(0))
+    counts = pd.DataFrame({'Consignee': names, 'Number of Shipments': np.arange(len(names), 0, -1)})
+    links = pd.DataFrame({'Consignee': names, 'Consignee D-U-N-S®': duns})
+    resolved = resolve(counts, links, cache_dir=None)
+    assert resolved.nunique() == 3000
@@ -0,0 +1,46 @@
+import pytest
+
+from cli import parse_condition
+from cube import build_cube, hs_code_prefix
+from ingest import load_us_imports
+
+
+@pytest.fixture
+def us_imports(us_imports_file):
+    return load_us_imports(us_imports_file, None)
+
+@pytest.fixture
+def cube(us_imports):
+    return build_cube(us_imports, 'us_imports')
+
+
+def test_query_by_month_matches_the_rows(cube, us_imports):
+    result = cube.query(['month'], where={'year': 2018})
+    rows = us_imports[us_imports['year'] == 2018]
+    expected = rows['Arrival Date'].dt.strftime('%Y-%m').value_counts()
+    assert result.set_index('month')['Number of Shipments'].to_dict() == expected.to_dict()
+
+def test_query_where_month_in_yyyy_mm(cube, us_imports):
+    result = cube.query(['Consignee'], where={'month': ['2018-11', '2018-12']})
+    dates = us_imports['Arrival Date']
+    assert result['Number of Shipments'].sum() == ((dates >= '2018-11-01') & (dates < '2019-01-01')).sum()
+    assert dict([parse_condition('month=2018-11|2018-12')]) == {'month': [24226, 24227]}
+    with pytest.raises(SystemExit):
+        parse_condition('month=24226')
+
+def test_query_top(cube, us_imports):
+    result = cube.query(['Consignee'], where={'HS Code': hs_code_prefix('7323')}, top=3)
+    rows = us_imports[us_imports['HS Code'].astype(str).str.contains(r'(?:^|;)\s*7323')]
+    expected = rows['Consignee'].value_counts().head(3)
+    assert result['Number of Shipments'].tolist() == expected.tolist()
+
+def test_share_by_month(cube, us_imports):
+    where = dict([parse_condition('Shipment Destination=Houston, Houston, Texas'), parse_condition('month^=2018')])
+    result = cube.share(['month'], where=where)
+    assert result['month'].str.match(r'^\d{4}-\d{2}$').all()
+    part = result[result['month'].str.startswith('2018')]
+    assert part['Part'].sum() == ((us_imports['year'] == 2018)
+                                  & (us_imports['Shipment Destination'] == 'Houston, Houston, Texas')).sum()
+    assert part['Part'].sum() > 0
+    assert result['Part'].where(~result['month'].str.startswith('2018'), 0).sum() == 0
+    assert (result['Share'] == result['Part'] / result['Total']).all()
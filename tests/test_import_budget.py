@@ -0,0 +1,50 @@
+"""Start-up cost of the command line entry point.
+
+Each check imports modules in a fresh interpreter and fails when an import raises,
+takes longer than the budget or loads a heavy dependency it should not: the CLI
+itself loads no third-party package, and computing the slide data (the `export`
+path) loads neither python-pptx nor geopandas / matplotlib.
+"""
+import json
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+# seconds allowed for the timed checks
+BUDGET = 0.15
+HEAVY = ['pandas', 'numpy', 'pptx', 'geopandas', 'matplotlib', 'shapely', 'fiona', 'lxml']
+
+# (modules imported, heavy modules that must stay unloaded, counts against the budget)
+CHECKS = [
+    (['cli'], HEAVY, True),
+    (['template'], HEAVY, True),
+    (['context', 'slides', 'ingest', 'panjiva', 'renderers'], ['pptx', 'geopandas', 'matplotlib', 'shapely', 'fiona'], False),
+]
+
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+for module in %r:
+    __import__(module)
+seconds = time.perf_counter() - start
+print(json.dumps({'seconds': seconds, 'loaded': [m for m in %r if m in sys.modules]}))
+'''
+
+
+def probe(modules, forbidden):
+    """seconds to import modules in a fresh interpreter and the forbidden modules it loaded
+    """
+    process = subprocess.run([sys.executable, '-c', PROBE % (modules, forbidden)], cwd=ROOT,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    assert process.returncode == 0, 'importing %s failed:\n%s' % (', '.join(modules), process.stderr)
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+@pytest.mark.parametrize('modules, forbidden, timed', CHECKS, ids=[', '.join(check[0]) for check in CHECKS])
+def test_import_budget(modules, forbidden, timed):
+    result = probe(modules, forbidden)
+    assert not result['loaded'], 'importing %s loads %s' % (', '.join(modules), ', '.join(result['loaded']))
+    if timed:
+        assert result['seconds'] <= BUDGET
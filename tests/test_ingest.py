@@ -0,0 +1,12 @@
+import pandas as pd
+
+from ingest import iter_us_imports, load_us_imports
+
+
+def test_download_without_duns_numbers(tmp_path, us_imports_file):
+    path = str(tmp_path / 'us_imports.csv')
+    pd.read_csv(us_imports_file, dtype=str).drop(columns=['Consignee D-U-N-S®']).to_csv(path, index=False)
+    df = load_us_imports(path, None)
+    assert df['Consignee D-U-N-S®'].isna().all()
+    assert len(df) == len(load_us_imports(us_imports_file, None))
+    assert sum(len(chunk) for chunk in iter_us_imports(path, 500)) == len(df)
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+import panjiva
+from ingest import load_us_imports
+
+
+class may_2019(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2019, 5, 15)
+
+    @classmethod
+    def today(cls):
+        return cls(2019, 5, 15)
+
+def test_yearly_imports_scales_a_partial_current_year(monkeypatch, us_imports_file):
+    monkeypatch.setattr(panjiva, 'datetime', may_2019)
+    us_imports = load_us_imports(us_imports_file, None)
+    yearly = panjiva.yearly_imports(us_imports, formatted=False)
+    shipments_2019 = int((us_imports['year'] == 2019).sum())
+    assert yearly['year'].tolist() == list(range(2014, 2020))
+    assert yearly['Number of Shipments'].iloc[-1] == int(shipments_2019 * 12 / 5)
+    assert yearly['Number of Shipments'].dtype.kind == 'i'
+
+def test_hs_imports_merge_12_counts_historical_codes_missing_from_the_12_month_top_5(us_imports_file):
+    us_imports = load_us_imports(us_imports_file, None)
+    us_imports_12 = us_imports[us_imports['month'].ge(panjiva.month_code(datetime(2018, 5, 1))).fillna(False)]
+    counts_12 = panjiva.hs_code_counts(us_imports_12).set_index('HS Code')['Number of Containers']
+    table = panjiva.hs_imports_merge_12(us_imports, us_imports_12)
+    codes = table['HS Code'].tolist()[:-2]
+    # 70 is in the historical top 5 only
+    assert '70' in codes and '70' not in counts_12.index[:5]
+    assert table['Number of Containers (past 12 months)'].tolist() == [
+        str(counts_12.get(code, 0)) for code in codes] + [
+        str(counts_12.sum() - counts_12.reindex(codes, fill_value=0).sum()), str(counts_12.sum())]
+    assert not table.isin(['nan']).any().any()
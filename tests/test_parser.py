@@ -0,0 +1,27 @@
+import io
+import os
+
+import pytest
+
+pytest.importorskip('pptx')
+
+from conftest import ROOT
+from context import load_frames
+from parser import parser
+from template import SUMMARY_PLACEHOLDER
+
+
+def slide_texts(prs):
+    return [' '.join(shape.text_frame.text for shape in slide.shapes if shape.has_text_frame)
+            for slide in prs.slides]
+
+def test_skipped_slides_are_the_ones_removed(china_exports_file, us_imports_file):
+    from pptx import Presentation
+
+    report = parser(os.path.join(ROOT, 'template.pptx'), *load_frames(china_exports_file, us_imports_file))
+    n_slides = len(report.prs.slides)
+    report.parse_all(skip=('shipment_destinations', 'hs_exports'))
+    prs = Presentation(io.BytesIO(report.save()))
+    assert len(prs.slides) == n_slides - 2
+    # every slide left in the deck was filled in
+    assert not [text for text in slide_texts(prs) if SUMMARY_PLACEHOLDER in text]
@@ -0,0 +1,36 @@
+from refresh import refresh_totals
+from ingest import iter_us_imports
+from streaming import stream_us_imports
+
+
+def monthly_shipments(totals):
+    return totals.totals(['month']).set_index('month')['Number of Shipments'].to_dict()
+
+def test_download_starting_after_the_last_saved_month(us_imports_file, split_download):
+    old = split_download('old.csv', lambda dates: dates < '2019-05')
+    new = split_download('new.csv', lambda dates: dates >= '2019-05')
+    totals = refresh_totals(stream_us_imports(old, 500), iter_us_imports(new, 500))
+    assert monthly_shipments(totals) == monthly_shipments(stream_us_imports(us_imports_file, 500))
+
+def test_download_reading_the_last_saved_month_again(us_imports_file, split_download):
+    old = split_download('old.csv', lambda dates: dates < '2019-04-15')
+    new = split_download('new.csv', lambda dates: dates >= '2019-04')
+    totals = refresh_totals(stream_us_imports(old, 500), iter_us_imports(new, 500))
+    full = stream_us_imports(us_imports_file, 500)
+    assert monthly_shipments(totals) == monthly_shipments(full)
+    assert totals.recent['Arrival Date'].tolist() == full.recent['Arrival Date'].tolist()
+
+def test_chunks_older_than_the_last_saved_month_are_not_read(us_imports_file, split_download):
+    saved = stream_us_imports(split_download('old.csv', lambda dates: dates < '2019-04-15'), 500)
+    start_month = saved.last_month()
+    chunks = list(iter_us_imports(us_imports_file, 100))
+    read = []
+
+    def download():
+        for chunk in chunks:
+            read.append(chunk)
+            yield chunk
+    totals = refresh_totals(saved, download())
+    assert monthly_shipments(totals) == monthly_shipments(stream_us_imports(us_imports_file, 500))
+    assert len(read) < len(chunks)
+    assert all(chunk['month'].max() >= start_month for chunk in read)
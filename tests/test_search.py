@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+from search import build_index, shipment_index, tokenize
+
+
+@pytest.fixture(scope='module')
+def index():
+    rows = pd.DataFrame({
+        'Arrival Date': pd.to_datetime(['2019-01-05', '2019-03-01', None, '2018-07-20', '2019-03-01']),
+        'Goods Shipped': ['VACUUM FLASK 500ML', 'Tumblers; vacuum flask lids', 'vacuum flask', 'glass jar',
+                          'stainless steel tumbler'],
+    })
+    return shipment_index.build(rows, 'Arrival Date', ['Goods Shipped'])
+
+
+def test_rows_are_latest_first(index):
+    # rows of the same date keep their order, rows without a date come last
+    assert index.latest(5)['Goods Shipped'].tolist() == [
+        'Tumblers; vacuum flask lids', 'stainless steel tumbler', 'VACUUM FLASK 500ML', 'glass jar', 'vacuum flask']
+
+def test_every_word_must_match(index):
+    assert index.search('flask vacuum')['Goods Shipped'].tolist() == [
+        'Tumblers; vacuum flask lids', 'VACUUM FLASK 500ML', 'vacuum flask']
+    assert index.search('vacuum flask 500ml')['Goods Shipped'].tolist() == ['VACUUM FLASK 500ML']
+    assert index.search('flask tumbler').empty
+
+def test_prefix(index):
+    assert index.search('tumbler')['Goods Shipped'].tolist() == ['stainless steel tumbler']
+    assert index.search('tumbler', prefix=True)['Goods Shipped'].tolist() == [
+        'Tumblers; vacuum flask lids', 'stainless steel tumbler']
+
+def test_no_match(index):
+    assert index.search('teapot').empty
+    assert index.search('zzz', prefix=True).empty
+    assert len(index.search('')) == 5
+
+def test_bundled_download(us_imports_file):
+    index = build_index(us_imports_file, 'us_imports')
+    dates = index.rows['Arrival Date']
+    assert dates.dropna().is_monotonic_decreasing
+    found = index.search('vacuum flask')
+    expected = index.rows['Goods Shipped'].map(lambda text: {'vacuum', 'flask'} <= set(tokenize(text)))
+    assert found.index.tolist() == index.rows.index[expected.to_numpy()].tolist()
+    assert len(found)
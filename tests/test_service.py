@@ -0,0 +1,96 @@
+import http.client
+import json
+import threading
+import time
+
+import pytest
+
+from service import make_server, report_service
+
+
+@pytest.fixture
+def server():
+    """a service on a free port with one worker, one queue place and a report that is
+    built once `release` is set
+    """
+    release = threading.Event()
+    service = report_service(workers=1, queue_size=1)
+    built = []
+
+    def build_report(china_exports_file, us_imports_file, output, template, chunksize):
+        release.wait(10)
+        built.append(chunksize)
+        return b'pptx'
+    # no warm up: the report is never really built
+    service.warm = lambda: setattr(service, 'build_report', build_report)
+    server = make_server(service.start(), port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.release = release
+    server.built = built
+    yield server
+    release.set()
+    server.shutdown()
+    server.server_close()
+
+def request(server, method, path, body=None):
+    connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=10)
+    connection.request(method, path, body=json.dumps(body) if body is not None else None,
+                       headers={'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    result = response.status, response.read(), dict(response.getheaders())
+    connection.close()
+    return result
+
+def health(server):
+    return json.loads(request(server, 'GET', '/health')[1])
+
+def wait_for(condition):
+    for _ in range(200):
+        if condition():
+            return
+        time.sleep(0.02)
+    raise AssertionError('timed out')
+
+
+def test_health(server):
+    status, body, _ = request(server, 'GET', '/health')
+    assert status == 200
+    assert json.loads(body) == {'workers': 1, 'active': 0, 'queued': 0, 'queue_size': 1, 'completed': 0}
+
+def test_json_request(server, china_exports_file, us_imports_file):
+    server.release.set()
+    status, body, headers = request(server, 'POST', '/report', {
+        'china_exports': china_exports_file, 'us_imports': us_imports_file, 'chunksize': 1000})
+    assert (status, body) == (200, b'pptx')
+    assert 'X-Report-Seconds' in headers
+    assert server.built == [1000]
+
+def test_full_queue(server, china_exports_file, us_imports_file):
+    files = {'china_exports': china_exports_file, 'us_imports': us_imports_file}
+    responses = []
+    waiting = [threading.Thread(target=lambda: responses.append(request(server, 'POST', '/report', files)))
+               for _ in range(2)]
+    waiting[0].start()
+    wait_for(lambda: health(server)['active'] == 1)
+    waiting[1].start()
+    wait_for(lambda: health(server)['queued'] == 1)
+
+    status, _, headers = request(server, 'POST', '/report', files)
+    assert status == 503 and headers['Retry-After'] == '5'
+    server.release.set()
+    for thread in waiting:
+        thread.join(10)
+    assert [status for status, _, _ in responses] == [200, 200]
+
+@pytest.mark.parametrize('chunksize', [0, -5, 2.5, '1000', True])
+def test_bad_chunksize(server, china_exports_file, us_imports_file, chunksize):
+    status, body, _ = request(server, 'POST', '/report', {
+        'china_exports': china_exports_file, 'us_imports': us_imports_file, 'chunksize': chunksize})
+    assert status == 400 and 'chunksize' in json.loads(body)['error']
+
+@pytest.mark.parametrize('body', [{'china_exports': 'missing.csv', 'us_imports': 'missing.csv'}, [1, 2]])
+def test_bad_request(server, body):
+    status, _, _ = request(server, 'POST', '/report', body)
+    assert status == 400
+    assert health(server)['completed'] == 0
@@ -0,0 +1,156 @@
+"""Per-stage wall time, CPU time and peak memory of a report run.
+
+Tracing is off unless turned on with enable() or the PANJIVA_TRACE environment
+variable (set to the path of the trace to write). When off, stage() and traced()
+cost one flag check per call.
+
+    with stage('load china exports'):
+        ...
+
+    @traced
+    def shipment_destinations(china_exports):
+        ...
+
+write() saves a Chrome trace (open it in chrome://tracing or Perfetto) whose
+events carry the cpu time and peak memory of each stage, and a per-stage summary.
+"""
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+_enabled = False
+_events = []
+_lock = threading.Lock()
+_local = threading.local()
+_origin = time.perf_counter()
+
+
+def enable(memory=True):
+    """start recording stages; memory=False skips tracemalloc, which slows allocation down
+    """
+    global _enabled
+    _enabled = True
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+def disable():
+    global _enabled
+    _enabled = False
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+def is_enabled():
+    return _enabled
+
+def reset():
+    with _lock:
+        del _events[:]
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+@contextmanager
+def stage(name, **args):
+    """record the wall time, cpu time and peak memory of the block as stage `name`.
+
+    Peak memory is the highest traced allocation above what was allocated when the
+    stage started, nested stages included. tracemalloc counts every thread, so peaks
+    of stages running side by side overlap.
+    """
+    if not _enabled:
+        yield
+        return
+
+    stack = _stack()
+    memory = tracemalloc.is_tracing()
+    base = 0
+    if memory:
+        base, peak = tracemalloc.get_traced_memory()
+        # the enclosing stage keeps the peak it reached so far, reset_peak would lose it
+        if stack:
+            stack[-1] = max(stack[-1], peak)
+        tracemalloc.reset_peak()
+    stack.append(0)
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        wall_time = time.perf_counter() - wall
+        cpu_time = time.thread_time() - cpu
+        child_peak = stack.pop()
+        event = {'name': name, 'start': wall - _origin, 'wall_s': wall_time, 'cpu_s': cpu_time,
+                 'depth': len(stack), 'thread': threading.get_ident(), 'args': args}
+        if memory and tracemalloc.is_tracing():
+            peak = max(tracemalloc.get_traced_memory()[1], child_peak)
+            event['peak_mb'] = max(peak - base, 0) / 1e6
+            if stack:
+                stack[-1] = max(stack[-1], peak)
+        with _lock:
+            _events.append(event)
+
+def traced(func=None, name=None):
+    """decorator recording every call of func as a stage named after it
+    """
+    if func is None:
+        return functools.partial(traced, name=name)
+    label = name or func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+        with stage(label):
+            return func(*args, **kwargs)
+    return wrapper
+
+def events():
+    with _lock:
+        return list(_events)
+
+def summary():
+    """calls, total wall and cpu time and the highest peak memory of each stage name
+    """
+    totals = {}
+    for event in events():
+        total = totals.setdefault(event['name'], {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'peak_mb': 0.0})
+        total['calls'] += 1
+        total['wall_s'] += event['wall_s']
+        total['cpu_s'] += event['cpu_s']
+        total['peak_mb'] = max(total['peak_mb'], event.get('peak_mb', 0.0))
+    return totals
+
+def chrome_trace():
+    """the recorded stages as complete ('X') events of the Chrome trace format
+    """
+    pid = os.getpid()
+    trace_events = []
+    for event in events():
+        args = dict(event['args'], cpu_ms=round(event['cpu_s'] * 1e3, 3))
+        if 'peak_mb' in event:
+            args['peak_mb'] = round(event['peak_mb'], 3)
+        trace_events.append({'name': event['name'], 'ph': 'X', 'pid': pid, 'tid': event['thread'],
+                             'ts': round(event['start'] * 1e6, 1), 'dur': round(event['wall_s'] * 1e6, 1),
+                             'args': args})
+    return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+def write(path=None):
+    """write the Chrome trace to path (default PANJIVA_TRACE) and the per-stage
+    summary next to it as <path>.summary.json
+    """
+    path = path or os.environ.get('PANJIVA_TRACE') or 'trace.json'
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(chrome_trace(), f)
+    with open(os.path.splitext(path)[0] + '.summary.json', 'w') as f:
+        json.dump(summary(), f, indent=1)
+    return path
+
+
+if os.environ.get('PANJIVA_TRACE'):
+    enable()